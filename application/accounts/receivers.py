@@ -0,0 +1,39 @@
+# Third-party
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+# Local
+from accounts.custom_signal import user_after_save
+from accounts.models import CustomUser
+from accounts.services import invalidate_user_country_ids
+
+
+@receiver(
+    user_after_save, sender=CustomUser, dispatch_uid="user_after_save_country_ids"
+)
+def user_after_save_invalidate_country_ids(sender, instance, *args, **kwargs):
+    invalidate_user_country_ids(instance.pk)
+
+
+@receiver(
+    m2m_changed,
+    sender=CustomUser.countries.through,
+    dispatch_uid="user_countries_changed",
+)
+def user_countries_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drop the cached country ids of every user whose countries changed, from
+    either side of the relation.
+    """
+    if not reverse:
+        if action.startswith("post_"):
+            invalidate_user_country_ids(instance.pk)
+    elif action == "pre_clear":
+        # the cleared users are only known before the rows are deleted
+        instance._cleared_user_ids = list(
+            instance.customuser_set.values_list("id", flat=True)
+        )
+    elif action == "post_clear":
+        invalidate_user_country_ids(*getattr(instance, "_cleared_user_ids", []))
+    elif action in ("post_add", "post_remove"):
+        invalidate_user_country_ids(*pk_set)
@@ -0,0 +1,37 @@
+# Third-party
+from django.core.cache import cache
+
+COUNTRY_IDS_CACHE_KEY = "accounts:user:{}:country_ids"
+COUNTRY_IDS_CACHE_TIMEOUT = 60 * 60
+# past this many ids SQLite plans the game lists on the user index and the
+# subquery through the M2M table is faster again
+COUNTRY_IDS_INLINE_LIMIT = 100
+
+
+def get_user_country_ids(user) -> list:
+    """
+    Ids of the countries a user may see games from. They are cached so the
+    game lists filter on `country_id IN (...)` without joining the M2M table;
+    the receivers in accounts.receivers drop the entry when they change.
+    """
+    key = COUNTRY_IDS_CACHE_KEY.format(user.pk)
+    country_ids = cache.get(key)
+    if country_ids is None:
+        country_ids = sorted(user.countries.values_list("id", flat=True))
+        cache.set(key, country_ids, COUNTRY_IDS_CACHE_TIMEOUT)
+    return country_ids
+
+
+def get_user_countries_lookup(user):
+    """
+    What the game lists filter `country_id__in` by: the cached ids for users
+    with up to COUNTRY_IDS_INLINE_LIMIT countries, the M2M subquery otherwise.
+    """
+    country_ids = get_user_country_ids(user)
+    if len(country_ids) > COUNTRY_IDS_INLINE_LIMIT:
+        return user.countries.all()
+    return country_ids
+
+
+def invalidate_user_country_ids(*user_ids):
+    cache.delete_many([COUNTRY_IDS_CACHE_KEY.format(user_id) for user_id in user_ids])
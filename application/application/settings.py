@@ -103,6 +103,39 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# CACHE_BACKEND picks a directory shared by the processes of a single node
+# (default), a Redis-protocol server (needs `redis`), the database (run
+# `createcachetable` first) or local memory, which is per process and only
+# fit for tests since the namespace versions must be shared by every worker
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "basketball_app",
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_DIR", ROOT_DIR / ".cache"),
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_URL", "redis://127.0.0.1:6379/0"),
+    },
+    "database": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": os.getenv("CACHE_TABLE", "cache"),
+    },
+}
+CACHES = {
+    "default": {
+        **CACHE_BACKENDS[os.getenv("CACHE_BACKEND", "file")],
+        "KEY_PREFIX": "basketball_app",
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", 300)),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -164,6 +197,36 @@ SIMPLE_JWT = {
 }
 
 
+# Upstream basketball API
+# https://rapidapi.com/api-sports/api/api-basketball
+RAPID_API = {
+    "BASE_URL": os.getenv("RAPID_API_URL", "https://api-basketball.p.rapidapi.com"),
+    "HOST": "api-basketball.p.rapidapi.com",
+    "KEY": os.getenv("RAPID_API_KEY"),
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 30,
+    "RETRIES": 3,
+    "BACKOFF_FACTOR": 0.5,
+    # requests allowed per period by the subscription quota
+    "RATE_LIMIT": int(os.getenv("RAPID_API_RATE_LIMIT", 10)),
+    "RATE_PERIOD": 60,
+    "POOL_SIZE": 10,
+    # on-disk response cache, set RAPID_API_CACHE_DIR to an empty value to disable
+    "CACHE_DIR": os.getenv("RAPID_API_CACHE_DIR", ROOT_DIR / ".upstream_cache"),
+    "CACHE_MAX_SIZE": 256 * 1024 * 1024,
+    # seconds a response stays fresh; games are cached forever once finished
+    "CACHE_TTL": {
+        "countries": 7 * 24 * 60 * 60,
+        "seasons": 7 * 24 * 60 * 60,
+        "leagues": 24 * 60 * 60,
+        "teams": 24 * 60 * 60,
+        "games": 30,
+    },
+    # serve only from the cache, never call the API
+    "OFFLINE": os.getenv("RAPID_API_OFFLINE", "") == "1",
+}
+
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "Basic": {"type": "basic"},
@@ -0,0 +1,12 @@
+# Local
+from application.settings import *  # noqa: F401, F403
+from application.settings import CACHE_BACKENDS
+
+# every test process gets its own cache, cleared between tests
+CACHES = {
+    "default": {
+        **CACHE_BACKENDS["locmem"],
+        "KEY_PREFIX": "basketball_app",
+        "TIMEOUT": 300,
+    }
+}
@@ -1,11 +1,16 @@
-# Third-party
+# Built-in
 import json
 import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from urllib.parse import parse_qsl, urlsplit
 
 # Third-party
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
@@ -66,3 +71,219 @@ def create_data_for_import():
         return data
 
     return _create_data_for_import
+
+
+@pytest.fixture(autouse=True)
+def upstream_settings(settings):
+    """
+    Tests must never wait on the quota of the real API nor share its response
+    cache: every test gets a fresh upstream client without backoff, with a
+    generous rate limit and no cache.
+    """
+    settings.RAPID_API = {
+        **settings.RAPID_API,
+        "BACKOFF_FACTOR": 0,
+        "RATE_LIMIT": 1000,
+        "RATE_PERIOD": 1,
+        "CACHE_DIR": None,
+        "OFFLINE": False,
+    }
+    return settings.RAPID_API
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    The cache outlives the database rollback between tests, start every test
+    with an empty one.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
+class UpstreamStub:
+    """
+    Local HTTP server standing in for the upstream API. Routes map a path to
+    a list of (status, body, headers) replies, the last one being repeated.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                with stub.lock:
+                    stub.requests.append(
+                        {
+                            "path": url.path,
+                            "params": dict(parse_qsl(url.query)),
+                            "headers": dict(self.headers),
+                        }
+                    )
+                    replies = stub.routes.get(url.path) or [(404, "{}", {})]
+                    reply = replies.pop(0) if len(replies) > 1 else replies[0]
+                if callable(reply):
+                    reply = reply(self)
+                status_code, body, headers = reply
+                try:
+                    self.send_response(status_code)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body.encode())))
+                    self.end_headers()
+                    self.wfile.write(body.encode())
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client gave up waiting, e.g. on a read timeout
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self.thread.start()
+
+    def add(self, path, *replies):
+        """
+        Each reply is a (status, body) or (status, body, headers) tuple, or a
+        callable receiving the request handler and returning such a tuple.
+        """
+        self.routes[path] = [
+            reply if callable(reply) else (*reply, {})[:3] for reply in replies
+        ]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope="function")
+def upstream_server(upstream_settings, settings):
+    stub = UpstreamStub()
+    settings.RAPID_API = {**upstream_settings, "BASE_URL": stub.url}
+    yield stub
+    stub.close()
+
+
+class RedisStub:
+    """
+    Local server speaking enough of the Redis protocol (RESP2) for Django's
+    RedisCache: GET, MGET, SET with EX/NX, DEL, EXISTS, INCRBY and FLUSHDB.
+    Expiry is ignored.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(StreamRequestHandler):
+            def read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                args = []
+                for _ in range(int(line[1:])):
+                    size = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(size + 2)[:-2])
+                return args
+
+            def handle(self):
+                while (args := self.read_command()) is not None:
+                    with stub.lock:
+                        stub.commands.append(args[0].upper().decode())
+                        reply = stub.execute(args[0].upper().decode(), args[1:])
+                    self.wfile.write(reply)
+
+        self.server = ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"redis://127.0.0.1:{self.server.server_address[1]}/0"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            daemon=True,
+        )
+        self.thread.start()
+
+    @staticmethod
+    def bulk(value):
+        if value is None:
+            return b"$-1\r\n"
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def execute(self, command, args):
+        if command in ("PING", "CLIENT", "SELECT"):
+            return b"+OK\r\n"
+        if command == "GET":
+            return self.bulk(self.data.get(args[0]))
+        if command == "MGET":
+            replies = [self.bulk(self.data.get(key)) for key in args]
+            return b"*%d\r\n%s" % (len(replies), b"".join(replies))
+        if command == "SET":
+            if b"NX" in (arg.upper() for arg in args[2:]) and args[0] in self.data:
+                return self.bulk(None)
+            self.data[args[0]] = args[1]
+            return b"+OK\r\n"
+        if command in ("DEL", "EXISTS"):
+            found = [key for key in args if key in self.data]
+            if command == "DEL":
+                for key in found:
+                    del self.data[key]
+            return b":%d\r\n" % len(found)
+        if command == "INCRBY":
+            value = int(self.data.get(args[0], b"0")) + int(args[1])
+            self.data[args[0]] = str(value).encode()
+            return b":%d\r\n" % value
+        if command == "FLUSHDB":
+            self.data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % command.encode()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope="function")
+def redis_cache(settings):
+    """
+    Point the default cache at a RedisStub, needs the `redis` package.
+    """
+    pytest.importorskip("redis")
+    stub = RedisStub()
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": stub.url,
+            # the stub only speaks RESP2, recent clients default to RESP3
+            "OPTIONS": {"protocol": 2},
+        }
+    }
+    yield stub
+    stub.close()
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(tmp_path_factory):
+    """
+    Test against an SQLite file like the deployed database: the in-memory
+    test database locks whole tables in shared-cache mode and fails
+    concurrent requests at once instead of waiting for the writer.
+    """
+    settings.DATABASES["default"]["TEST"]["NAME"] = str(
+        tmp_path_factory.mktemp("db") / "test.sqlite3"
+    )
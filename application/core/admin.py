@@ -2,6 +2,8 @@
 from django.contrib import admin
 
 # Local
-from core.models import Country
+from core.models import CacheNamespace, Country, ImportCheckpoint
 
 admin.site.register(Country)
+admin.site.register(ImportCheckpoint)
+admin.site.register(CacheNamespace)
@@ -0,0 +1,65 @@
+# Built-in
+import time
+
+# Third-party
+from django.core.cache import cache
+from django.db import transaction
+
+# Local
+from core.models import CacheNamespace
+
+VERSION_KEY = "namespace:{}:version"
+
+
+def get_namespace_version(namespace: str) -> int:
+    """
+    Current version of a namespace, the Unix time of its last write. The
+    counter lives in the database, shared by every process and never lost,
+    and the cache only holds a copy of it so that reads make no query.
+    """
+    return cache.get_or_set(
+        VERSION_KEY.format(namespace), lambda: _get_stored_version(namespace), None
+    )
+
+
+def _get_stored_version(namespace: str) -> int:
+    row, _ = CacheNamespace.objects.get_or_create(
+        name=namespace, defaults={"version": int(time.time())}
+    )
+    return row.version
+
+
+def bump_namespace(*namespaces: str):
+    """
+    Move the namespaces to a new version once the current transaction commits
+    (right away outside of one), so that a read in between cannot cache the
+    data of the write being rolled back or not visible yet under the new
+    version. Keys of the former versions are never read again and expire on
+    their own.
+    """
+    transaction.on_commit(lambda: _bump_namespaces(namespaces))
+
+
+def _bump_namespaces(namespaces: tuple):
+    for namespace in namespaces:
+        with transaction.atomic():
+            row, created = CacheNamespace.objects.select_for_update().get_or_create(
+                name=namespace, defaults={"version": int(time.time())}
+            )
+            if not created:
+                # the current second, or one past the last version when the
+                # writes come faster, so every write gets its own second
+                row.version = max(row.version + 1, int(time.time()))
+                row.save(update_fields=["version"])
+            # under the row lock, a concurrent bump cannot set an older one
+            cache.set(VERSION_KEY.format(namespace), row.version, None)
+
+
+def namespaced_key(namespace: str, key: str, version: int = None) -> str:
+    """
+    Key of `key` in the current version of the namespace. Build it before
+    reading the database, a write in between then only orphans the value.
+    """
+    if version is None:
+        version = get_namespace_version(namespace)
+    return f"{namespace}:{version}:{key}"
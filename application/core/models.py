@@ -13,3 +13,48 @@ class Country(models.Model):
     class Meta:
         verbose_name = "Country"
         verbose_name_plural = "Countries"
+
+
+class ImportCheckpoint(models.Model):
+    source = models.CharField(
+        max_length=255, unique=True, help_text="Payload being imported"
+    )
+    fingerprint = models.CharField(
+        max_length=40,
+        blank=True,
+        default="",
+        help_text="Identifies the payload the cursor points into",
+    )
+    cursor = models.PositiveIntegerField(default=0, help_text="Items imported")
+    offset = models.PositiveBigIntegerField(
+        default=0, help_text="Position in the file after the items imported"
+    )
+    counts = models.JSONField(default=dict, blank=True)
+    pending = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Keys collected by the chunks, handled once the import ends",
+    )
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.cursor}"
+
+    class Meta:
+        verbose_name = "Import checkpoint"
+        verbose_name_plural = "Import checkpoints"
+
+
+class CacheNamespace(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(
+        help_text="Unix time of the last write, one past it for faster writes"
+    )
+
+    def __str__(self):
+        return f"{self.name} @ {self.version}"
+
+    class Meta:
+        verbose_name = "Cache namespace"
+        verbose_name_plural = "Cache namespaces"
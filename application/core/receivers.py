@@ -0,0 +1,13 @@
+# Third-party
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+# Local
+from core.cache import bump_namespace
+from core.models import Country
+
+
+@receiver(post_save, sender=Country, dispatch_uid="country_saved")
+@receiver(post_delete, sender=Country, dispatch_uid="country_deleted")
+def country_changed(sender, **kwargs):
+    bump_namespace("countries")
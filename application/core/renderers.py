@@ -0,0 +1,56 @@
+# Third-party
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional, the renderers fall back to the json module
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with `orjson` when it is installed. The bytes are
+    the same: compact UTF-8, and what orjson does not encode the same way
+    (datetimes, lazy strings, ...) goes through the encoder of DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return self.dumps(data)
+
+    def dumps(self, data) -> bytes:
+        """
+        `data` as compact JSON, without the content negotiation of `render`.
+        """
+        if orjson is None:
+            return super().render(data)
+        return (
+            orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+            # escaped by JSONRenderer for JavaScript
+            .replace("\u2028".encode(), b"\\u2028").replace(
+                "\u2029".encode(), b"\\u2029"
+            )
+        )
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    """
+    Newline-delimited JSON. Views stream their rows themselves in this
+    format, anything else they render (e.g. errors) is a single line.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rendered = super().render(data, accepted_media_type, renderer_context)
+        return rendered + b"\n" if rendered else rendered
@@ -1,19 +1,144 @@
-from core.models import Country
+# Built-in
+import hashlib
+import itertools
+import json
+import logging
+from typing import Callable, Iterable, Iterator
 
+# Third-party
+from django.db import transaction
 
-def import_countries(data: list):
-    db_countries = Country.objects.all()
+# Local
+from core.cache import bump_namespace
+from core.models import Country, ImportCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def payload_fingerprint(data: list) -> str:
+    """
+    Hash of the ids of a payload, a resumed import only trusts its checkpoint
+    when the payload is still the same.
+    """
+    ids = json.dumps([item["id"] for item in data])
+    return hashlib.sha1(ids.encode()).hexdigest()
+
+
+def import_in_chunks(
+    items: Iterable,
+    import_chunk: Callable[[list], dict],
+    source: str = None,
+    fingerprint: str = "",
+    chunk_size: int = 500,
+    pending: set = None,
+    finish: Callable[[set], None] = None,
+) -> dict:
+    """
+    Hand `items` to `import_chunk` in chunks, each one committed in its own
+    transaction. With a `source`, a checkpoint holding the cursor and the
+    counts is saved in the same transaction, so a failed import resumes after
+    the last committed chunk. The counts returned by `import_chunk` are summed.
+
+    Work too costly to repeat per chunk is deferred: `import_chunk` adds its
+    keys to the `pending` set, which is checkpointed with the cursor, and
+    `finish(pending)` runs once after the last chunk.
+
+    Readers with `offset` and `seek()`, like the file readers of
+    games.readers, also save their offset and resume by seeking to it rather
+    than reading the items already imported again.
+    """
+    seekable = callable(getattr(items, "seek", None))
+    checkpoint = None
+    if source is not None:
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=source)
+        if checkpoint.completed or checkpoint.fingerprint != fingerprint:
+            checkpoint.fingerprint = fingerprint
+            checkpoint.cursor = 0
+            checkpoint.offset = 0
+            checkpoint.counts = {}
+            checkpoint.pending = []
+            checkpoint.completed = False
+            checkpoint.save()
+        elif checkpoint.cursor:
+            logger.info("Resuming %s after %s items", source, checkpoint.cursor)
+
+    cursor = checkpoint.cursor if checkpoint else 0
+    totals = dict(checkpoint.counts) if checkpoint else {}
+    if checkpoint is not None and pending is not None:
+        # JSON turned the tuple keys into lists
+        pending.update(
+            tuple(key) if isinstance(key, list) else key for key in checkpoint.pending
+        )
+    if seekable and checkpoint is not None and checkpoint.offset:
+        items.seek(checkpoint.offset)
+    elif cursor:
+        items = itertools.islice(items, cursor, None)
+    for chunk in chunked(items, chunk_size):
+        with transaction.atomic():
+            result = import_chunk(chunk)
+            cursor += len(chunk)
+            for key, value in result.items():
+                totals[key] = totals.get(key, 0) + value
+            if checkpoint is not None:
+                checkpoint.cursor = cursor
+                checkpoint.counts = totals
+                update_fields = ["cursor", "counts", "updated_at"]
+                if pending is not None:
+                    checkpoint.pending = list(pending)
+                    update_fields.append("pending")
+                if seekable:
+                    checkpoint.offset = items.offset
+                    update_fields.append("offset")
+                checkpoint.save(update_fields=update_fields)
+
+    with transaction.atomic():
+        if finish is not None:
+            finish(pending)
+        if checkpoint is not None:
+            checkpoint.completed = True
+            checkpoint.pending = []
+            checkpoint.save(update_fields=["completed", "pending", "updated_at"])
+    return totals
+
+
+def _import_countries_chunk(data: list) -> dict:
+    existing = set(
+        Country.objects.filter(
+            reference_id__in={country_data["id"] for country_data in data}
+        ).values_list("reference_id", flat=True)
+    )
     countries = []
-    for idx, country_data in enumerate(data, start=1):
-        if not db_countries.filter(reference_id=country_data["id"]).exists():
-            countries.append(
-                Country(
-                    reference_id=country_data["id"],
-                    name=country_data["name"],
-                    code=country_data["code"],
-                )
+    for country_data in data:
+        if country_data["id"] in existing:
+            continue
+        existing.add(country_data["id"])
+        countries.append(
+            Country(
+                reference_id=country_data["id"],
+                name=country_data["name"],
+                code=country_data["code"],
             )
-            print(f'{idx}. {country_data["name"]} added')
+        )
+        print(f'{country_data["name"]} added')
 
     Country.objects.bulk_create(countries)
+    # bulk_create sends no post_save
+    bump_namespace("countries")
+    return {"created": len(countries)}
+
+
+def import_countries(data: list, source: str = None, chunk_size: int = 500):
+    import_in_chunks(
+        data,
+        _import_countries_chunk,
+        source=source,
+        fingerprint=payload_fingerprint(data),
+        chunk_size=chunk_size,
+    )
     return True
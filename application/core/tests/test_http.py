@@ -1,12 +1,18 @@
+# Built-in
+import time
+
 # Third-party
 import pytest
 from django.contrib.auth import get_user_model
+from django.utils.http import parse_http_date
 from rest_framework import status
 from rest_framework.reverse import reverse
 
 # Local
+from core.cache import bump_namespace
 from core.models import Country
 from core.serializers import CountrySerializer
+from core.services import import_countries
 
 
 @pytest.mark.django_db
@@ -107,3 +113,117 @@ def test_country_delete(create_user, create_authenticated_client, create_country
 
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert Country.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_country_list_is_cached_until_a_write(
+    create_user,
+    create_authenticated_client,
+    create_country,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    country = create_country()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("core:countries-list")
+    client.get(url)
+
+    # only the user lookup
+    with django_assert_num_queries(1):
+        response = client.get(url)
+    assert response.data["results"][0] == CountrySerializer(country).data
+
+    # the namespace is bumped once the write commits
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(
+            reverse("core:countries-detail", kwargs={"pk": country.id}),
+            {"name": "Canada"},
+            format="json",
+        )
+    response = client.get(url)
+    assert response.data["results"][0]["name"] == "Canada"
+
+    # bulk imports send no signals and bump the namespace themselves
+    with django_capture_on_commit_callbacks(execute=True):
+        import_countries(data=[{"id": 2, "name": "Mexico", "code": "MX"}])
+    assert client.get(url).data["count"] == 2
+
+
+@pytest.mark.django_db
+def test_country_list_conditional_get(
+    create_user,
+    create_authenticated_client,
+    create_country,
+    django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    country = create_country()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("core:countries-list")
+    response = client.get(url)
+    etag = response["ETag"]
+    last_modified = response["Last-Modified"]
+    assert etag.startswith('"countries-')
+    assert "no-cache" in response["Cache-Control"]
+
+    # only the user lookup, nothing is read nor serialized
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response["ETag"] == etag
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # the namespace is bumped once the write commits
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(
+            reverse("core:countries-detail", kwargs={"pk": country.id}),
+            {"name": "Canada"},
+            format="json",
+        )
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+    assert response.data["results"][0]["name"] == "Canada"
+
+    # even within the same second, a write is never answered with a 304
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_200_OK
+    assert parse_http_date(response["Last-Modified"]) >= parse_http_date(last_modified)
+
+
+@pytest.mark.django_db
+def test_country_list_last_modified_is_not_in_the_future(
+    create_user,
+    create_authenticated_client,
+    create_country,
+    django_capture_on_commit_callbacks,
+):
+    create_country()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("core:countries-list")
+    # a burst of writes moved the version ahead of the clock
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(5):
+            bump_namespace("countries")
+
+    response = client.get(url)
+    last_modified = response["Last-Modified"]
+    assert parse_http_date(last_modified) <= time.time()
+
+    # the ETag still validates, If-Modified-Since waits for the clock
+    response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == status.HTTP_200_OK
@@ -1,9 +1,30 @@
+# Built-in
+import datetime
+import decimal
+import io
+import os
+import threading
+import time
+
 # Third-party
 import pytest
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import transaction
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 
 # Local
-from core.models import Country
-from core.services import import_countries
+from core import renderers, upstream
+from core.cache import bump_namespace, get_namespace_version, namespaced_key
+from core.models import Country, ImportCheckpoint
+from core.serializers import CountrySerializer, RowMapper
+from core.services import import_countries, import_in_chunks
+from core.upstream import RateLimiter, ResponseCache, UpstreamOfflineError, get_client
 
 
 @pytest.mark.django_db
@@ -12,3 +33,376 @@ def test_import_countries_service(create_data_for_import):
     data = context["response"]
     assert import_countries(data=data) is True
     assert Country.objects.count() == 75
+
+
+@pytest.mark.django_db
+def test_import_in_chunks_resumes_from_checkpoint(create_data_for_import):
+    data = create_data_for_import(filename="countries")["response"]
+    calls = []
+
+    def import_chunk(chunk):
+        calls.append(chunk[0]["id"])
+        if len(calls) == 3:
+            raise RuntimeError("Connection lost")
+        Country.objects.bulk_create(
+            [
+                Country(reference_id=item["id"], name=item["name"], code=item["code"])
+                for item in chunk
+            ]
+        )
+        return {"created": len(chunk)}
+
+    with pytest.raises(RuntimeError):
+        import_in_chunks(data, import_chunk, source="countries", chunk_size=20)
+    checkpoint = ImportCheckpoint.objects.get(source="countries")
+    # the failed chunk was rolled back with its checkpoint
+    assert Country.objects.count() == checkpoint.cursor == 40
+    assert checkpoint.counts == {"created": 40}
+    assert checkpoint.completed is False
+
+    result = import_in_chunks(data, import_chunk, source="countries", chunk_size=20)
+    checkpoint.refresh_from_db()
+    assert calls[3] == data[40]["id"]
+    assert result == {"created": 75}
+    assert Country.objects.count() == checkpoint.cursor == 75
+    assert checkpoint.completed is True
+
+
+@pytest.mark.django_db
+def test_import_in_chunks_restarts_on_other_payload(create_data_for_import):
+    data = create_data_for_import(filename="countries")["response"]
+    ImportCheckpoint.objects.create(
+        source="countries", fingerprint="other", cursor=40, counts={"created": 40}
+    )
+
+    import_countries(data=data, source="countries", chunk_size=20)
+    checkpoint = ImportCheckpoint.objects.get(source="countries")
+    assert Country.objects.count() == 75
+    assert checkpoint.counts == {"created": 75}
+
+
+@pytest.mark.django_db
+def test_import_countries_command(upstream_server):
+    with open(os.path.join(settings.ROOT_DIR, "examples/countries.json")) as file:
+        upstream_server.add("/countries", (200, file.read()))
+    out = io.StringIO()
+    call_command("import_countries", stdout=out)
+
+    assert Country.objects.count() == 75
+    assert "Done." in out.getvalue()
+    assert upstream_server.requests[0]["headers"]["X-RapidAPI-Host"] == (
+        "api-basketball.p.rapidapi.com"
+    )
+
+
+def test_upstream_client_sends_params(upstream_server):
+    upstream_server.add("/games", (200, '{"results": 0}'))
+    response = get_client().get("games", params={"league": 178, "season": 2022})
+
+    assert response.status_code == 200
+    assert response.json() == {"results": 0}
+    assert upstream_server.requests[0]["params"] == {"league": "178", "season": "2022"}
+
+
+def test_upstream_client_is_built_once_across_threads(upstream_server, monkeypatch):
+    built = []
+    build_client = upstream._build_client
+
+    def slow_build_client():
+        time.sleep(0.05)
+        built.append(build_client())
+        return built[-1]
+
+    monkeypatch.setattr("core.upstream._build_client", slow_build_client)
+    barrier = threading.Barrier(8)
+    clients = []
+
+    def run():
+        barrier.wait()
+        clients.append(get_client())
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(client is built[0] for client in clients)
+
+
+def test_upstream_client_reuses_connections(upstream_server):
+    ports = set()
+
+    def reply(handler):
+        ports.add(handler.client_address[1])
+        return 200, "{}", {}
+
+    upstream_server.add("/seasons", reply)
+    client = get_client()
+    for _ in range(5):
+        client.get("seasons")
+
+    assert len(ports) == 1
+
+
+def test_upstream_client_retries_on_errors(upstream_server):
+    upstream_server.add(
+        "/leagues",
+        (503, "{}"),
+        (429, "{}", {"Retry-After": "0"}),
+        (200, '{"results": 1}'),
+    )
+    response = get_client().get("leagues")
+
+    assert response.status_code == 200
+    assert len(upstream_server.requests) == 3
+
+
+def test_upstream_client_gives_up_after_retries(upstream_server, settings):
+    settings.RAPID_API = {**settings.RAPID_API, "RETRIES": 2}
+    upstream_server.add("/leagues", (500, "{}"))
+    response = get_client().get("leagues")
+
+    assert response.status_code == 500
+    assert len(upstream_server.requests) == 3
+
+
+def test_upstream_client_read_timeout(upstream_server, settings):
+    settings.RAPID_API = {**settings.RAPID_API, "RETRIES": 0, "READ_TIMEOUT": 0.1}
+
+    def slow_reply(handler):
+        time.sleep(0.5)
+        return 200, "{}", {}
+
+    upstream_server.add("/teams", slow_reply)
+    with pytest.raises(requests.RequestException):
+        get_client().get("teams")
+
+
+def test_rate_limiter_waits_for_tokens():
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(rate=2, period=10, clock=lambda: now[0], sleep=sleep)
+    for _ in range(4):
+        limiter.acquire()
+
+    assert waits == [5.0, 5.0]
+    assert now[0] == 10.0
+
+
+@pytest.fixture
+def upstream_cache(upstream_server, settings, tmp_path):
+    settings.RAPID_API = {
+        **settings.RAPID_API,
+        "CACHE_DIR": tmp_path / "cache",
+        "CACHE_TTL": {"countries": 60, "seasons": 0, "games": 0},
+    }
+    return upstream_server
+
+
+def test_upstream_cache_serves_fresh_responses(upstream_cache):
+    upstream_cache.add("/countries", (200, '{"results": 1}'))
+    first = get_client().get("countries")
+    second = get_client().get("countries")
+    other = get_client().get("countries", params={"name": "USA"})
+
+    assert first.json() == second.json() == other.json() == {"results": 1}
+    assert second.headers["X-Cache"] == "HIT"
+    assert len(upstream_cache.requests) == 2
+
+
+def test_upstream_cache_revalidates_stale_responses(upstream_cache):
+    upstream_cache.add(
+        "/seasons",
+        (200, '{"results": 2}', {"ETag": '"v1"'}),
+        (304, ""),
+    )
+    get_client().get("seasons")
+    response = get_client().get("seasons")
+
+    assert response.json() == {"results": 2}
+    assert upstream_cache.requests[1]["headers"]["If-None-Match"] == '"v1"'
+
+
+def test_upstream_cache_keeps_finished_games_forever(upstream_cache):
+    with open(os.path.join(settings.ROOT_DIR, "examples/games.json")) as file:
+        finished = file.read()
+    live = finished.replace('"short": "FT"', '"short": "Q2"')
+    upstream_cache.add("/games", (200, finished), (200, live))
+
+    for _ in range(2):
+        get_client().get("games", params={"league": 1})
+    for _ in range(2):
+        get_client().get("games", params={"league": 2})
+
+    assert len(upstream_cache.requests) == 3
+
+
+def test_upstream_cache_offline(upstream_cache):
+    upstream_cache.add("/countries", (200, '{"results": 1}'))
+    get_client().get("countries")
+
+    assert get_client().get("countries", offline=True).json() == {"results": 1}
+    with pytest.raises(UpstreamOfflineError):
+        get_client().get("leagues", offline=True)
+    assert len(upstream_cache.requests) == 1
+
+
+@pytest.mark.django_db
+def test_import_countries_command_offline(upstream_cache):
+    out = io.StringIO()
+    call_command("import_countries", offline=True, stdout=out)
+
+    assert "not cached" in out.getvalue()
+    assert upstream_cache.requests == []
+
+
+def test_upstream_cache_evicts_least_recently_used(tmp_path):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"x" * 100
+    cache = ResponseCache(directory=tmp_path, max_size=10**6, ttl={})
+    cache.set("teams", {"page": 0}, response)
+    entry_size = next(tmp_path.glob("*.json")).stat().st_size
+    # room for three entries, their sizes differ by a few bytes of timestamp
+    cache.max_size = entry_size * 3 + entry_size // 2
+    for page in range(3):
+        cache.set("teams", {"page": page}, response)
+        time.sleep(0.01)
+    cache.get("teams", {"page": 0})
+    time.sleep(0.01)
+    cache.set("teams", {"page": 3}, response)
+
+    assert cache.get("teams", {"page": 0}) is not None
+    assert cache.get("teams", {"page": 1}) is None
+    assert cache.get("teams", {"page": 2}) is not None
+    assert cache.get("teams", {"page": 3}) is not None
+
+
+def _check_namespaced_cache():
+    key = namespaced_key("countries", "list")
+    cache.set(key, [1, 2])
+    assert cache.get(namespaced_key("countries", "list")) == [1, 2]
+
+    version = get_namespace_version("countries")
+    bump_namespace("countries")
+    assert get_namespace_version("countries") > version
+    assert cache.get(namespaced_key("countries", "list")) is None
+    # other namespaces keep their keys
+    assert namespaced_key("teams", "list") == namespaced_key("teams", "list")
+
+
+# outside of a transaction the bumps are applied right away
+@pytest.mark.django_db(transaction=True)
+def test_namespaced_cache_locmem():
+    _check_namespaced_cache()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_namespaced_cache_file(settings, tmp_path):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path),
+        }
+    }
+    _check_namespaced_cache()
+    assert any(tmp_path.iterdir())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_namespaced_cache_redis(redis_cache):
+    _check_namespaced_cache()
+    assert {"SET", "GET"} <= set(redis_cache.commands)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bump_namespace_after_eviction():
+    bump_namespace("seasons")
+    version = get_namespace_version("seasons")
+    cache.clear()
+    # the counter is read back from the database, never restarted
+    assert get_namespace_version("seasons") == version
+    bump_namespace("seasons")
+    assert get_namespace_version("seasons") > version
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bump_namespace_gives_every_write_its_own_second():
+    versions = [get_namespace_version("teams")]
+    for _ in range(5):
+        bump_namespace("teams")
+        versions.append(get_namespace_version("teams"))
+    assert versions == sorted(set(versions))
+    assert versions[-1] <= time.time() + 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bump_namespace_waits_for_the_commit():
+    version = get_namespace_version("countries")
+    with transaction.atomic():
+        bump_namespace("countries")
+        assert get_namespace_version("countries") == version
+    assert get_namespace_version("countries") > version
+    version = get_namespace_version("countries")
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            bump_namespace("countries")
+            raise RuntimeError("Rolled back")
+    assert get_namespace_version("countries") == version
+
+
+@pytest.mark.django_db
+def test_row_mapper_matches_serializer():
+    country = Country.objects.create(reference_id=1, name="Romania", code=None)
+    mapper = RowMapper.for_serializer(CountrySerializer)
+
+    assert RowMapper.for_serializer(CountrySerializer) is mapper
+    rows = Country.objects.values(*mapper.columns)
+    assert [mapper(row) for row in rows] == [CountrySerializer(country).data]
+
+
+def test_row_mapper_rejects_computed_fields():
+    class NamedCountrySerializer(CountrySerializer):
+        label = serializers.SerializerMethodField()
+
+        def get_label(self, obj):
+            return obj.name
+
+    class UpperCountrySerializer(CountrySerializer):
+        upper = serializers.CharField(source="name.upper")
+
+    for serializer_class in (NamedCountrySerializer, UpperCountrySerializer):
+        with pytest.raises(ImproperlyConfigured):
+            RowMapper(serializer_class)
+
+
+def test_fast_json_renderer_matches_json_renderer(monkeypatch):
+    pytest.importorskip("orjson")
+    data = {
+        "datetime": datetime.datetime(
+            2023, 2, 19, 10, 0, 1, 123456, tzinfo=datetime.timezone.utc
+        ),
+        "date": datetime.date(2023, 2, 19),
+        "decimal": decimal.Decimal("1.50"),
+        "lazy": gettext_lazy("Invalid cursor"),
+        "text": "Amânat\u2028\u2029",
+        1: [1.5, None, True, {"nested": []}],
+    }
+
+    fast = renderers.FastJSONRenderer()
+    assert fast.render(data) == JSONRenderer().render(data)
+    assert fast.render(data, "application/json; indent=4") == JSONRenderer().render(
+        data, "application/json; indent=4"
+    )
+    assert fast.render(None) == b""
+
+    monkeypatch.setattr(renderers, "orjson", None)
+    assert fast.dumps(data) == JSONRenderer().render(data)
@@ -0,0 +1,295 @@
+# Built-in
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Third-party
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+FINISHED_GAME_STATUSES = ("FT", "AOT")
+
+
+class UpstreamOfflineError(requests.RequestException):
+    """
+    Raised in offline mode when a request is not in the response cache.
+    """
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `rate` calls per `period` seconds, shared by every
+    thread using the client.
+    """
+
+    def __init__(self, rate: int, period: float, clock=time.monotonic, sleep=None):
+        self.capacity = rate
+        self.fill_rate = rate / period
+        self.tokens = float(rate)
+        self.clock = clock
+        self.sleep = sleep or time.sleep
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.fill_rate,
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            self.sleep(wait)
+
+
+class ResponseCache:
+    """
+    On-disk cache of upstream responses keyed by endpoint and params. Every
+    entry is a JSON file; reading an entry bumps its mtime and the least
+    recently used files are evicted once the directory grows past `max_size`
+    bytes.
+    """
+
+    def __init__(self, directory, max_size: int, ttl: dict):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+
+    def _path(self, endpoint: str, params: dict) -> Path:
+        key = json.dumps([endpoint, params or {}], sort_keys=True, default=str)
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def get_ttl(self, endpoint: str, body: str):
+        """
+        Seconds an entry stays fresh, None meaning forever: games that are all
+        finished never change again, any other games response may be live.
+        """
+        if endpoint == "games":
+            try:
+                games = json.loads(body).get("response") or []
+            except (ValueError, AttributeError):
+                games = []
+            if games and all(
+                game["status"]["short"] in FINISHED_GAME_STATUSES for game in games
+            ):
+                return None
+        return self.ttl.get(endpoint, 0)
+
+    def get(self, endpoint: str, params: dict):
+        path = self._path(endpoint, params)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def set(self, endpoint: str, params: dict, response: requests.Response) -> dict:
+        entry = {
+            "endpoint": endpoint,
+            "params": params or {},
+            "body": response.text,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "ttl": self.get_ttl(endpoint, response.text),
+        }
+        self._write(self._path(endpoint, params), entry)
+        self.evict()
+        return entry
+
+    def revalidated(self, endpoint: str, params: dict, entry: dict) -> dict:
+        entry["stored_at"] = time.time()
+        self._write(self._path(endpoint, params), entry)
+        return entry
+
+    def _write(self, path: Path, entry: dict):
+        # write to a temporary file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file)
+        os.replace(temp_path, path)
+
+    def evict(self):
+        with self.lock:
+            files = []
+            for path in self.directory.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            size = sum(file_size for _, file_size, _ in files)
+            for _, file_size, path in sorted(files):
+                if size <= self.max_size:
+                    break
+                path.unlink(missing_ok=True)
+                size -= file_size
+
+    @staticmethod
+    def is_fresh(entry: dict) -> bool:
+        if entry["ttl"] is None:
+            return True
+        return time.time() - entry["stored_at"] < entry["ttl"]
+
+    @staticmethod
+    def to_response(entry: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response._content = entry["body"].encode()
+        response.encoding = "utf-8"
+        response.headers = CaseInsensitiveDict({"X-Cache": "HIT"})
+        return response
+
+
+class UpstreamClient:
+    """
+    RapidAPI basketball client: one pooled keep-alive session with connect and
+    read timeouts, exponential backoff on 429/5xx (honouring Retry-After) and
+    a client-side rate limiter matching the API quota.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        host: str,
+        key: str,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        rate_limit: int = 10,
+        rate_period: float = 60,
+        pool_size: int = 10,
+        cache: ResponseCache = None,
+        offline: bool = False,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limiter = RateLimiter(rate=rate_limit, period=rate_period)
+        self.cache = cache
+        self.offline = offline
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["X-RapidAPI-Key"] = key or ""
+        self.session.headers["X-RapidAPI-Host"] = host
+
+    def _fetch(self, endpoint: str, params: dict, headers: dict = None):
+        self.rate_limiter.acquire()
+        return self.session.get(
+            url=f"{self.base_url}/{endpoint.lstrip('/')}",
+            params=params,
+            headers=headers,
+            timeout=self.timeout,
+        )
+
+    def get(
+        self, endpoint: str, params: dict = None, offline: bool = False
+    ) -> requests.Response:
+        """
+        Serve fresh responses from the cache, revalidate stale ones with
+        If-None-Match/If-Modified-Since and only download on a miss. Offline,
+        any cached entry is served and a miss raises UpstreamOfflineError.
+        """
+        offline = offline or self.offline
+        endpoint = endpoint.strip("/")
+        entry = self.cache.get(endpoint, params) if self.cache else None
+        if entry is not None and (offline or self.cache.is_fresh(entry)):
+            return self.cache.to_response(entry)
+        if offline:
+            raise UpstreamOfflineError(f"{endpoint} {params or ''} is not cached.")
+
+        headers = {}
+        if entry is not None and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry is not None and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = self._fetch(endpoint, params, headers)
+
+        if response.status_code == 304 and entry is not None:
+            return self.cache.to_response(
+                self.cache.revalidated(endpoint, params, entry)
+            )
+        if response.status_code == 200 and self.cache is not None:
+            self.cache.set(endpoint, params, response)
+        return response
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> UpstreamClient:
+    """
+    The client shared by every thread, built once under a lock so concurrent
+    first calls do not each open a session.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def _build_client() -> UpstreamClient:
+    config = settings.RAPID_API
+    return UpstreamClient(
+        base_url=config["BASE_URL"],
+        host=config["HOST"],
+        key=config["KEY"],
+        connect_timeout=config["CONNECT_TIMEOUT"],
+        read_timeout=config["READ_TIMEOUT"],
+        retries=config["RETRIES"],
+        backoff_factor=config["BACKOFF_FACTOR"],
+        rate_limit=config["RATE_LIMIT"],
+        rate_period=config["RATE_PERIOD"],
+        pool_size=config["POOL_SIZE"],
+        cache=ResponseCache(
+            directory=config["CACHE_DIR"],
+            max_size=config["CACHE_MAX_SIZE"],
+            ttl=config["CACHE_TTL"],
+        )
+        if config["CACHE_DIR"]
+        else None,
+        offline=config["OFFLINE"],
+    )
+
+
+@receiver(setting_changed, dispatch_uid="reset_upstream_client")
+def reset_upstream_client(setting, **kwargs):
+    global _client
+    if setting == "RAPID_API":
+        with _client_lock:
+            _client = None
@@ -1,17 +1,87 @@
+# Built-in
+import hashlib
+import time
+
 # Third-party
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 # Local
+from core.cache import get_namespace_version, namespaced_key
 from core.models import Country
 from core.permissions import AdminsOnlyPermission
 from core.serializers import CountrySerializer
 
 
-class CountryViewSet(viewsets.ModelViewSet):
+class CachedReferenceViewSetMixin:
+    """
+    Serve list and detail responses from the cache namespace of the model.
+    Writes bump the namespace version (see the receivers), so a cached page
+    is never served once the table changed.
+
+    The version, a shared counter of seconds that moves forward on every
+    write, also makes the ETag and the Last-Modified header (capped at the
+    current time), so conditional requests get a 304 before any query or
+    serialization.
+    """
+
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, view, request, *args, **kwargs):
+        version = get_namespace_version(self.cache_namespace)
+        etag = quote_etag(
+            f"{self.cache_namespace}-{version}-{request.accepted_renderer.format}"
+        )
+        # a distinct second for every write, possibly a few seconds ahead
+        # of the clock after a burst of writes: Last-Modified never goes past
+        # now, and until the clock catches up only the ETag validates
+        last_modified = min(version, int(time.time()))
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified if last_modified == version else None,
+        )
+        if response is None:
+            response = self.cached_data_response(
+                version, view, request, *args, **kwargs
+            )
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def cached_data_response(self, version, view, request, *args, **kwargs):
+        # the absolute url keeps the pagination links right
+        url = request.build_absolute_uri()
+        key = namespaced_key(
+            self.cache_namespace, hashlib.sha1(url.encode()).hexdigest(), version
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
+
+
+class CountryViewSet(CachedReferenceViewSetMixin, viewsets.ModelViewSet):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated, AdminsOnlyPermission)
     model = Country
     queryset = Country.objects.order_by("-id")
     serializer_class = CountrySerializer
+    cache_namespace = "countries"
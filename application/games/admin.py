@@ -2,9 +2,57 @@
 from django.contrib import admin
 
 # Local
-from games.models import Game, League, Season, Team
+from games.models import (
+    Game,
+    GameDay,
+    GameScore,
+    HeadToHead,
+    ImportJob,
+    League,
+    Season,
+    Standing,
+    Team,
+    TeamSeasonStats,
+)
+from games.scores import set_score_totals
+from games.services import games_changed, get_game_keys
+
+
+@admin.register(Game)
+class GameAdmin(admin.ModelAdmin):
+    """
+    Keep the tables built from games in step with the changes made here.
+    """
+
+    def save_model(self, request, obj, form, change):
+        old_keys = set()
+        if change:
+            old_keys = get_game_keys(Game.objects.filter(pk=obj.pk))
+        super().save_model(request, set_score_totals(obj), form, change)
+        games_changed(
+            old_keys,
+            get_game_keys([obj]),
+            created=[] if change else [obj],
+            rescored=[obj] if change else [],
+        )
+
+    def delete_model(self, request, obj):
+        keys = get_game_keys([obj])
+        super().delete_model(request, obj)
+        games_changed(keys)
+
+    def delete_queryset(self, request, queryset):
+        keys = get_game_keys(queryset)
+        super().delete_queryset(request, queryset)
+        games_changed(keys)
+
 
 admin.site.register(Season)
 admin.site.register(League)
 admin.site.register(Team)
-admin.site.register(Game)
+admin.site.register(GameDay)
+admin.site.register(GameScore)
+admin.site.register(Standing)
+admin.site.register(TeamSeasonStats)
+admin.site.register(HeadToHead)
+admin.site.register(ImportJob)
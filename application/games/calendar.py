@@ -0,0 +1,126 @@
+# Built-in
+import datetime
+from typing import Iterable, Set, Tuple
+
+# Third-party
+from django.db.models import Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from rest_framework import serializers
+
+# Local
+from games.filters import start_of_day
+from games.models import Game, GameDay
+
+DayKey = Tuple[int, datetime.date]
+ONE_DAY = datetime.timedelta(days=1)
+
+_datetime_field = serializers.DateTimeField()
+
+
+def get_game_day(value: datetime.datetime) -> datetime.date:
+    return timezone.localtime(value).date()
+
+
+def get_game_day_keys(queryset) -> Set[DayKey]:
+    """
+    The (country, date) buckets holding the games of `queryset`.
+    """
+    return set(
+        queryset.annotate(day=TruncDate("datetime"))
+        .order_by()
+        .values_list("country_id", "day")
+        .distinct()
+    )
+
+
+def _calendar_entry(game: dict) -> dict:
+    return {
+        "id": game["id"],
+        "datetime": _datetime_field.to_representation(game["datetime"]),
+        "status": game["status"],
+        "league": game["league_id"],
+        "home_team": game["home_team_id"],
+        "away_team": game["away_team_id"],
+        "user": game["user_id"],
+    }
+
+
+def refresh_game_days(keys: Iterable[DayKey], batch_size: int = 500):
+    """
+    Rebuild the given (country, date) buckets from the games table.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    # one range per run of consecutive days, the days in between are not read
+    runs = []
+    for country_id, day in sorted(keys):
+        if runs and runs[-1][0] == country_id and runs[-1][2] + ONE_DAY == day:
+            runs[-1][2] = day
+        else:
+            runs.append([country_id, day, day])
+    games_filter = Q()
+    for country_id, first_day, last_day in runs:
+        games_filter |= Q(
+            country_id=country_id,
+            datetime__gte=start_of_day(first_day),
+            datetime__lt=start_of_day(last_day + ONE_DAY),
+        )
+
+    buckets = {key: [] for key in keys}
+    games = (
+        Game.objects.filter(games_filter)
+        .order_by("datetime", "id")
+        .values(
+            "id",
+            "country_id",
+            "datetime",
+            "status",
+            "league_id",
+            "home_team_id",
+            "away_team_id",
+            "user_id",
+        )
+    )
+    for game in games:
+        key = (game["country_id"], get_game_day(game["datetime"]))
+        if key in buckets:
+            buckets[key].append(_calendar_entry(game))
+
+    GameDay.objects.bulk_create(
+        [
+            GameDay(
+                country_id=country_id,
+                date=day,
+                games=entries,
+                games_count=len(entries),
+                unassigned_count=sum(entry["user"] is None for entry in entries),
+            )
+            for (country_id, day), entries in buckets.items()
+            if entries
+        ],
+        update_conflicts=True,
+        unique_fields=["country", "date"],
+        update_fields=["games", "games_count", "unassigned_count"],
+        batch_size=batch_size,
+    )
+    empty = Q()
+    for (country_id, day), entries in buckets.items():
+        if not entries:
+            empty |= Q(country_id=country_id, date=day)
+    if empty:
+        GameDay.objects.filter(empty).delete()
+
+
+def rebuild_game_days(batch_size: int = 500) -> int:
+    """
+    Recompute every bucket from scratch.
+    """
+    keys = sorted(get_game_day_keys(Game.objects.all()))
+    GameDay.objects.all().delete()
+    for start in range(0, len(keys), batch_size):
+        end = start + batch_size
+        refresh_game_days(keys[start:end], batch_size=batch_size)
+    return len(keys)
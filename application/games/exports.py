@@ -0,0 +1,196 @@
+# Built-in
+import csv
+import gzip
+import io
+import itertools
+from typing import Iterator
+
+# Local
+from core.renderers import FastJSONRenderer
+from core.serializers import RowMapper
+from games.models import Game
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, the exports fall back to gzip CSV
+    pyarrow = None
+
+# (column, lookup) of an exported row, teams and leagues denormalized
+EXPORT_COLUMNS = (
+    ("id", "id"),
+    ("reference_id", "reference_id"),
+    ("datetime", "datetime"),
+    ("status", "status"),
+    ("country_id", "country_id"),
+    ("country", "country__name"),
+    ("season", "season__year"),
+    ("league_id", "league_id"),
+    ("league", "league__name"),
+    ("league_type", "league__type"),
+    ("home_team_id", "home_team_id"),
+    ("home_team", "home_team__name"),
+    ("away_team_id", "away_team_id"),
+    ("away_team", "away_team__name"),
+    ("home_total", "home_total"),
+    ("away_total", "away_total"),
+    ("user_id", "user_id"),
+)
+
+EXPORT_FORMATS = {
+    "csv": ("application/gzip", "csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def get_default_export_format() -> str:
+    return "parquet" if pyarrow is not None else "csv"
+
+
+class ChunkBuffer:
+    """
+    Write-only file object that hands out what was written since the last
+    `take()`, so that compressed output can be streamed piece by piece.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_game_rows(queryset, chunk_size: int = 5000) -> Iterator[list]:
+    """
+    Lists of at most `chunk_size` rows of the games of `queryset`, read with
+    a single joined query through a chunked iterator.
+    """
+    rows = queryset.values_list(*(lookup for _, lookup in EXPORT_COLUMNS)).iterator(
+        chunk_size=chunk_size
+    )
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _iter_csv(chunks: Iterator[list]) -> Iterator[bytes]:
+    buffer = ChunkBuffer()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as archive:
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(column for column, _ in EXPORT_COLUMNS)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            archive.write(text.getvalue().encode())
+            text.seek(0)
+            text.truncate()
+            # gzip holds back what it has not compressed yet
+            data = buffer.take()
+            if data:
+                yield data
+    yield buffer.take()
+
+
+def _get_parquet_schema():
+    return pyarrow.schema(
+        [
+            ("id", pyarrow.int64()),
+            ("reference_id", pyarrow.int64()),
+            ("datetime", pyarrow.timestamp("us", tz="UTC")),
+            ("status", pyarrow.string()),
+            ("country_id", pyarrow.int64()),
+            ("country", pyarrow.string()),
+            ("season", pyarrow.int16()),
+            ("league_id", pyarrow.int64()),
+            ("league", pyarrow.string()),
+            ("league_type", pyarrow.string()),
+            ("home_team_id", pyarrow.int64()),
+            ("home_team", pyarrow.string()),
+            ("away_team_id", pyarrow.int64()),
+            ("away_team", pyarrow.string()),
+            ("home_total", pyarrow.int32()),
+            ("away_total", pyarrow.int32()),
+            ("user_id", pyarrow.int64()),
+        ]
+    )
+
+
+def _iter_parquet(chunks: Iterator[list]) -> Iterator[bytes]:
+    schema = _get_parquet_schema()
+    buffer = ChunkBuffer()
+    with pyarrow.parquet.ParquetWriter(buffer, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            # every chunk becomes a row group
+            columns = zip(*chunk)
+            writer.write_table(
+                pyarrow.Table.from_arrays(
+                    [
+                        pyarrow.array(values, type=field.type)
+                        for values, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+            yield buffer.take()
+    yield buffer.take()
+
+
+def iter_game_export(
+    queryset=None, file_format: str = "csv", chunk_size: int = 5000
+) -> Iterator[bytes]:
+    """
+    The bytes of an export of the games of `queryset` (all games by default)
+    as gzip CSV or, with `pyarrow` installed, zstd-compressed Parquet. Only
+    one chunk of rows is held in memory at a time.
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}.")
+    if file_format == "parquet" and pyarrow is None:
+        raise ValueError("Parquet exports need the `pyarrow` package.")
+    if queryset is None:
+        queryset = Game.objects.order_by("pk")
+    chunks = iter_game_rows(queryset, chunk_size=chunk_size)
+    if file_format == "parquet":
+        return _iter_parquet(chunks)
+    return _iter_csv(chunks)
+
+
+def iter_game_ndjson(
+    queryset, mapper: RowMapper, chunk_size: int = 500
+) -> Iterator[bytes]:
+    """
+    One JSON line per game of `queryset`, as mapped by the RowMapper of a
+    game serializer. The rows come from a chunked iterator and each chunk is
+    sent as soon as it is encoded.
+    """
+    dumps = FastJSONRenderer().dumps
+    rows = queryset.values(*mapper.columns).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield b"".join(dumps(data) + b"\n" for data in mapper.map(chunk))
@@ -0,0 +1,54 @@
+# Built-in
+import datetime
+
+# Third-party
+from django.db.models import Q
+from django.utils.timezone import get_current_timezone, make_aware
+from rest_framework.filters import BaseFilterBackend
+
+# Local
+from games.pagination import GamePagination
+from games.serializers import GameFilterSerializer
+
+
+def start_of_day(day: datetime.date) -> datetime.datetime:
+    return make_aware(
+        datetime.datetime.combine(day, datetime.time.min), get_current_timezone()
+    )
+
+
+def filter_games(queryset, filters: dict):
+    """
+    Apply validated game filters. Dates become a half-open range on
+    `datetime` rather than a `__date` lookup so that the indexes apply.
+    """
+    for field in ("country", "league", "season", "user", "status"):
+        if field in filters:
+            queryset = queryset.filter(**{field: filters[field]})
+    if "team" in filters:
+        queryset = queryset.filter(
+            Q(home_team=filters["team"]) | Q(away_team=filters["team"])
+        )
+    if "date_from" in filters:
+        queryset = queryset.filter(datetime__gte=start_of_day(filters["date_from"]))
+    if "date_to" in filters:
+        next_day = filters["date_to"] + datetime.timedelta(days=1)
+        queryset = queryset.filter(datetime__lt=start_of_day(next_day))
+    return queryset
+
+
+class GameFilterBackend(BaseFilterBackend):
+    """
+    `league`, `season`, `team` (home or away), `status`, `date_from` and
+    `date_to` query parameters, plus one of the whitelisted orderings of
+    GamePagination.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        serializer = GameFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        queryset = filter_games(queryset, serializer.validated_data)
+        ordering = serializer.validated_data.get(
+            "ordering", GamePagination.default_ordering
+        )
+        return queryset.order_by(*GamePagination.orderings[ordering])
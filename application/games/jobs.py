@@ -0,0 +1,147 @@
+# Built-in
+import datetime
+import json
+from typing import Optional, Tuple
+
+# Third-party
+import requests
+from django.utils import timezone
+
+# Local
+from core.services import import_in_chunks, payload_fingerprint
+from core.upstream import get_client
+from games.models import ImportJob
+from games.services import games_source, sync_games
+from games.stats import refresh_game_stats
+
+
+def enqueue_import_job(params: dict, upsert: bool = False, user=None) -> ImportJob:
+    return ImportJob.objects.create(params=params, upsert=upsert, user=user)
+
+
+# a running job whose worker gave no sign of life for this long is requeued
+STALE_JOB_TIMEOUT = datetime.timedelta(minutes=10)
+
+
+def requeue_stale_import_jobs(timeout: datetime.timedelta = STALE_JOB_TIMEOUT) -> int:
+    """
+    Put back in the queue the running jobs left behind by a crashed worker.
+    Their imports are checkpointed, so the next worker resumes them.
+    """
+    return ImportJob.objects.filter(
+        status=ImportJob.Statuses.RUNNING,
+        heartbeat_at__lt=timezone.now() - timeout,
+    ).update(status=ImportJob.Statuses.PENDING)
+
+
+def claim_next_import_job(
+    stale_timeout: datetime.timedelta = STALE_JOB_TIMEOUT,
+) -> Optional[ImportJob]:
+    """
+    Move the oldest pending job to running and return it. The conditional
+    update makes sure that two workers never claim the same job. Stale
+    running jobs are requeued first.
+    """
+    requeue_stale_import_jobs(stale_timeout)
+    pending = ImportJob.objects.filter(status=ImportJob.Statuses.PENDING)
+    for job_id in pending.order_by("id").values_list("id", flat=True)[:10]:
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(
+            pk=job_id, status=ImportJob.Statuses.PENDING
+        ).update(status=ImportJob.Statuses.RUNNING, started_at=now, heartbeat_at=now)
+        if claimed:
+            return ImportJob.objects.get(pk=job_id)
+    return None
+
+
+def _finish(job: ImportJob, status: str, message: str = ""):
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "message", "finished_at"])
+
+
+def fetch_games(params: dict, offline: bool = False) -> requests.Response:
+    return get_client().get("games", params=params, offline=offline)
+
+
+def parse_games_response(response: requests.Response) -> Tuple[Optional[list], str]:
+    """
+    Return the games of an upstream /games response, or None and the reason
+    when the call failed or its body is not the expected envelope.
+    """
+    if response.status_code not in (200, 400):
+        return None, "Service unavailable."
+    try:
+        data = json.loads(response.text)
+        if response.status_code == 400:
+            return None, f'{data["errors"]}'
+        if not data["results"]:
+            return [], "No results matched."
+        games = data["response"]
+        if not isinstance(games, list):
+            raise TypeError(f"expected a list of games, got {type(games).__name__}")
+        return games, ""
+    except (ValueError, KeyError, TypeError) as error:
+        return None, f"Invalid upstream response: {error!r}"
+
+
+def process_import_job(job: ImportJob, chunk_size: int = 500) -> ImportJob:
+    """
+    Fetch the games of a claimed job from the upstream API and import them
+    chunk by chunk. The counters are saved in the transaction of each chunk so
+    that the status endpoint can report progress, and the import is
+    checkpointed so a job retrying the same request resumes where it stopped.
+    """
+    try:
+        response = fetch_games(job.params)
+    except requests.RequestException as error:
+        _finish(job, ImportJob.Statuses.FAILED, f"Service unavailable: {error}")
+        return job
+
+    games, message = parse_games_response(response)
+    if games is None:
+        _finish(job, ImportJob.Statuses.FAILED, message)
+        return job
+    if not games:
+        _finish(job, ImportJob.Statuses.FINISHED, message)
+        return job
+
+    job.rows_received = len(games)
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=["rows_received", "heartbeat_at"])
+
+    stat_keys = set()
+
+    def import_chunk(chunk: list) -> dict:
+        result = sync_games(data=chunk, upsert=job.upsert, stat_keys=stat_keys)
+        job.rows_inserted += result["created"]
+        job.rows_updated += result["updated"]
+        job.rows_skipped += result["skipped"]
+        job.heartbeat_at = timezone.now()
+        job.save(
+            update_fields=[
+                "rows_inserted",
+                "rows_updated",
+                "rows_skipped",
+                "heartbeat_at",
+            ]
+        )
+        return result
+
+    try:
+        import_in_chunks(
+            games,
+            import_chunk,
+            source=games_source(job.params),
+            fingerprint=payload_fingerprint(games),
+            chunk_size=chunk_size,
+            pending=stat_keys,
+            finish=refresh_game_stats,
+        )
+    except Exception as error:
+        _finish(job, ImportJob.Statuses.FAILED, str(error))
+        raise
+
+    _finish(job, ImportJob.Statuses.FINISHED)
+    return job
@@ -0,0 +1,58 @@
+# Built-in
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand
+
+# Local
+from games.models import Game
+from games.scores import refresh_game_scores
+from games.standings import FINISHED_GAME_STATUSES
+from games.stats import refresh_game_stats
+
+
+def refresh_batch_stats(games: list):
+    # the standings and stats only count games with typed totals
+    refresh_game_stats(
+        {
+            (game.league_id, game.season_id, team_id)
+            for game in games
+            if game.status in FINISHED_GAME_STATUSES
+            for team_id in (game.home_team_id, game.away_team_id)
+        }
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the typed total columns and the per period score rows of the "
+        "games from their scores JSON, and recount the standings, team stats "
+        "and head-to-heads of the games of every batch. Run it once right "
+        "after upgrading to the typed columns: until then the games without "
+        "totals are left out of those tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Games rewritten per batch.",
+        )
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only the games without typed totals yet.",
+        )
+
+    def handle(self, *args, **options):
+        games = Game.objects.all()
+        if options["missing"]:
+            games = games.filter(home_total__isnull=True, away_total__isnull=True)
+
+        started = time.perf_counter()
+        games_count = refresh_game_scores(
+            games, batch_size=options["batch_size"], on_batch=refresh_batch_stats
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Done. {games_count} games backfilled in {elapsed:.2f}s.")
@@ -0,0 +1,110 @@
+# Built-in
+import statistics
+import time
+from collections import defaultdict
+
+# Third-party
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum
+
+# Local
+from games.models import Game, GameScore, Season
+from games.scores import PERIODS
+
+
+def _non_empty(totals: dict) -> dict:
+    return {team_id: dict(team) for team_id, team in totals.items() if team}
+
+
+def _json_aggregates(season: Season) -> dict:
+    """
+    Points for and against and per period of every team, parsing the scores
+    JSON of every game in Python.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    games = Game.objects.filter(season=season)
+    for home_team_id, away_team_id, scores in games.values_list(
+        "home_team_id", "away_team_id", "scores"
+    ):
+        home, away = scores.get("home") or {}, scores.get("away") or {}
+        for team_id, scored, conceded in (
+            (home_team_id, home, away),
+            (away_team_id, away, home),
+        ):
+            team = totals[team_id]
+            if scored.get("total") is not None and conceded.get("total") is not None:
+                team["points_for"] += scored["total"]
+                team["points_against"] += conceded["total"]
+            for period in PERIODS:
+                if scored.get(period) is not None:
+                    team[period] += scored[period]
+    return _non_empty(totals)
+
+
+def _normalized_aggregates(season: Season) -> dict:
+    """
+    The same figures summed by the database over the typed total columns
+    and the GameScore rows.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    with_totals = Game.objects.filter(
+        season=season, home_total__isnull=False, away_total__isnull=False
+    )
+    for side, other in (("home", "away"), ("away", "home")):
+        for row in (
+            with_totals.values(team_id=F(f"{side}_team_id"))
+            .annotate(
+                points_for=Sum(f"{side}_total"), points_against=Sum(f"{other}_total")
+            )
+            .order_by()
+        ):
+            team = totals[row["team_id"]]
+            team["points_for"] += row["points_for"]
+            team["points_against"] += row["points_against"]
+    for row in (
+        GameScore.objects.filter(season=season)
+        .values("team_id", "period")
+        .annotate(points=Sum("points"))
+        .order_by()
+    ):
+        totals[row["team_id"]][row["period"]] += row["points"]
+    return _non_empty(totals)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the season wide per team score aggregates through the scores "
+        "JSON and through the normalized columns, and check that they agree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, required=True, help="YYYY")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs of each path.")
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        try:
+            season = Season.objects.get(year=options["season"])
+        except Season.DoesNotExist:
+            raise CommandError(f"Season {options['season']} does not exist.")
+
+        results = {}
+        for name, aggregate in (
+            ("json", _json_aggregates),
+            ("normalized", _normalized_aggregates),
+        ):
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                results[name] = aggregate(season)
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{name}: {len(results[name])} teams, median "
+                f"{statistics.median(timings):.2f} ms over {len(timings)} runs."
+            )
+
+        if results["json"] != results["normalized"]:
+            raise CommandError("The aggregates differ, run backfill_game_scores first.")
+        games_count = Game.objects.filter(season=season).count()
+        self.stdout.write(f"Done. {games_count} games, the aggregates agree.")
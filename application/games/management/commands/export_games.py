@@ -0,0 +1,67 @@
+# Built-in
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand, CommandError
+
+# Local
+from games.exports import EXPORT_FORMATS, get_default_export_format, iter_game_export
+from games.models import Game, Season
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the games, with their country, league and teams, to a Parquet "
+        "file (needs `pyarrow`) or a gzip CSV file for offline analysis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the file to write.")
+        parser.add_argument(
+            "--format",
+            choices=["auto", *EXPORT_FORMATS],
+            default="auto",
+            help="auto picks parquet when pyarrow is installed, csv otherwise.",
+        )
+        parser.add_argument(
+            "--season",
+            type=int,
+            help="Season year to export, every season by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows read per database round trip and written per row group.",
+        )
+
+    def handle(self, *args, **options):
+        file_format = options["format"]
+        if file_format == "auto":
+            file_format = get_default_export_format()
+
+        games = Game.objects.order_by("pk")
+        if options["season"]:
+            try:
+                games = games.filter(season=Season.objects.get(year=options["season"]))
+            except Season.DoesNotExist:
+                raise CommandError(f"Season {options['season']} does not exist.")
+
+        started = time.perf_counter()
+        try:
+            chunks = iter_game_export(
+                games, file_format=file_format, chunk_size=options["chunk_size"]
+            )
+            with open(options["path"], "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        except ValueError as error:
+            raise CommandError(str(error))
+        except OSError as error:
+            raise CommandError(f"Could not write {options['path']}: {error}")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Done. {games.count()} games exported as {file_format} "
+            f"to {options['path']} in {elapsed:.2f}s."
+        )
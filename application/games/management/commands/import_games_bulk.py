@@ -0,0 +1,145 @@
+# Built-in
+import datetime
+import itertools
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Third-party
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+# Local
+from core.services import import_in_chunks, payload_fingerprint
+from games.jobs import fetch_games, parse_games_response
+from games.services import games_source, sync_games
+from games.stats import refresh_game_stats
+
+
+def _date_range(date_from: datetime.date, date_to: datetime.date) -> list:
+    days = (date_to - date_from).days
+    return [str(date_from + datetime.timedelta(days=day)) for day in range(days + 1)]
+
+
+def _fetch_in_window(executor, requests_params: list, offline: bool, window: int):
+    """
+    Yield the params and the future of every request as the responses
+    arrive, with at most `window` requests submitted and not yet handed out,
+    so the responses waiting for the writer stay bounded.
+    """
+    params_iterator = iter(requests_params)
+    pending = {}
+    while True:
+        for params in itertools.islice(params_iterator, window - len(pending)):
+            pending[executor.submit(fetch_games, params, offline)] = params
+        if not pending:
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future
+
+
+class Command(BaseCommand):
+    help = (
+        "Import the games of several leagues, seasons and dates. The upstream "
+        "calls run concurrently while a single writer imports the responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--leagues", nargs="+", type=int, required=True)
+        parser.add_argument(
+            "--seasons", nargs="+", required=True, help="YYYY or YYYY-YYYY"
+        )
+        parser.add_argument(
+            "--date-from",
+            type=datetime.date.fromisoformat,
+            help="First date to fetch, YYYY-MM-DD. Requires --date-to.",
+        )
+        parser.add_argument(
+            "--date-to",
+            type=datetime.date.fromisoformat,
+            help="Last date to fetch, YYYY-MM-DD. Requires --date-from.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Concurrent upstream calls, 1 fetches serially.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Games committed per transaction and checkpoint.",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Only use the cached upstream responses.",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Refresh the status and scores of games already imported.",
+        )
+
+    def handle(self, *args, **options):
+        if bool(options["date_from"]) != bool(options["date_to"]):
+            raise CommandError("--date-from and --date-to go together.")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+
+        dates = [None]
+        if options["date_from"]:
+            dates = _date_range(options["date_from"], options["date_to"])
+        requests_params = []
+        for league, season, date in itertools.product(
+            options["leagues"], options["seasons"], dates
+        ):
+            params = {"league": league, "season": season}
+            if date:
+                params["date"] = date
+            requests_params.append(params)
+
+        totals = {"created": 0, "updated": 0, "skipped": 0}
+        failed = 0
+        started = time.perf_counter()
+        # worker threads only talk to the upstream API, the database is written
+        # from this thread alone so that SQLite never sees concurrent writers
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            for params, future in _fetch_in_window(
+                executor,
+                requests_params,
+                options["offline"],
+                window=2 * options["workers"],
+            ):
+                try:
+                    games, message = parse_games_response(future.result())
+                except requests.RequestException as error:
+                    games, message = None, f"Service unavailable: {error}"
+
+                if games is None:
+                    failed += 1
+                    self.stderr.write(f"{params}: {message}")
+                    continue
+                stat_keys = set()
+                result = import_in_chunks(
+                    games,
+                    lambda chunk: sync_games(
+                        data=chunk, upsert=options["upsert"], stat_keys=stat_keys
+                    ),
+                    source=games_source(params),
+                    fingerprint=payload_fingerprint(games),
+                    chunk_size=options["chunk_size"],
+                    pending=stat_keys,
+                    finish=refresh_game_stats,
+                )
+                for key, value in result.items():
+                    totals[key] += value
+                self.stdout.write(f"{params}: {result.get('created', 0)} added")
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Done. {len(requests_params)} requests ({failed} failed), "
+            f"{totals['created']} added, {totals['updated']} updated, "
+            f"{totals['skipped']} skipped in {elapsed:.2f}s."
+        )
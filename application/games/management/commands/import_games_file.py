@@ -0,0 +1,102 @@
+# Built-in
+import hashlib
+import json
+import os
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand, CommandError
+
+# Local
+from core.services import import_in_chunks
+from games.readers import EnvelopeReader, NDJSONReader
+from games.services import sync_games
+from games.stats import refresh_game_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Import games from a local JSON dump, either an API envelope like "
+        "examples/games.json or NDJSON with one game per line."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path of the games dump.")
+        parser.add_argument(
+            "--format",
+            choices=["auto", "envelope", "ndjson"],
+            default="auto",
+            help="auto picks ndjson for .ndjson/.jsonl files, envelope otherwise.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Games committed per transaction and checkpoint.",
+        )
+        parser.add_argument(
+            "--no-resume",
+            action="store_true",
+            help="Start over instead of resuming an interrupted import.",
+        )
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Refresh the status and scores of games already imported.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"]
+        if file_format == "auto":
+            is_ndjson = path.endswith((".ndjson", ".jsonl"))
+            file_format = "ndjson" if is_ndjson else "envelope"
+        reader = NDJSONReader if file_format == "ndjson" else EnvelopeReader
+
+        totals = {"created": 0, "updated": 0, "skipped": 0}
+
+        stat_keys = set()
+
+        def import_chunk(chunk: list) -> dict:
+            result = sync_games(
+                data=chunk, upsert=options["upsert"], stat_keys=stat_keys
+            )
+            for key, value in result.items():
+                totals[key] += value
+            self.stdout.write(
+                f"{sum(totals.values())} games read, {totals['created']} added"
+            )
+            return result
+
+        started = time.perf_counter()
+        try:
+            # a modified file gets a new fingerprint and is imported from scratch
+            stat = os.stat(path)
+            fingerprint = hashlib.sha1(
+                f"{stat.st_size}:{stat.st_mtime_ns}".encode()
+            ).hexdigest()
+            # binary, the checkpoint resumes from a byte offset
+            with open(path, "rb") as file:
+                import_in_chunks(
+                    reader(file),
+                    import_chunk,
+                    source=(
+                        None
+                        if options["no_resume"]
+                        else f"file:{os.path.abspath(path)}"
+                    ),
+                    fingerprint=fingerprint,
+                    chunk_size=options["chunk_size"],
+                    pending=stat_keys,
+                    finish=refresh_game_stats,
+                )
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError) as error:
+            raise CommandError(f"Could not read {path}: {error}")
+
+        elapsed = time.perf_counter() - started
+        rows = sum(totals.values())
+        self.stdout.write(
+            f"Done. {totals['created']} added, {totals['updated']} updated, "
+            f"{totals['skipped']} skipped in {elapsed:.2f}s "
+            f"({rows / elapsed if elapsed else 0:.0f} rows/s)."
+        )
@@ -1,33 +1,41 @@
 # built-in
 import json
-import os
 
 # third-party
 import requests
 from django.core.management.base import BaseCommand
 
 # local
+from core.upstream import UpstreamOfflineError, get_client
 from games.services import import_leagues
 
 
 class Command(BaseCommand):
     help = "Import leagues into database."
 
-    def handle(self, *args, **options):
-        headers = dict()
-        headers["X-RapidAPI-Key"] = os.getenv("RAPID_API_KEY")
-        headers["X-RapidAPI-Host"] = "api-basketball.p.rapidapi.com"
-        response = requests.get(
-            url="https://api-basketball.p.rapidapi.com/leagues",
-            headers=headers,
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Only use the cached upstream responses.",
         )
 
+    def handle(self, *args, **options):
+        try:
+            response = get_client().get("leagues", offline=options["offline"])
+        except UpstreamOfflineError as error:
+            self.stdout.write(f"{error}")
+            return
+        except requests.RequestException:
+            self.stdout.write("Service Unavailable.")
+            return
+
         if response.status_code == 200:
             data = json.loads(response.text)
             if not data["results"]:
                 self.stdout.write("No results found.")
 
-            import_leagues(data=data["response"])
+            import_leagues(data=data["response"], source="leagues")
             self.stdout.write("Done.")
 
         elif response.status_code == 400:
@@ -1,6 +1,5 @@
 # built-in
 import json
-import os
 from itertools import zip_longest
 
 # third-party
@@ -8,21 +7,30 @@ import requests
 from django.core.management.base import BaseCommand
 
 # local
+from core.upstream import UpstreamOfflineError, get_client
 from games.services import import_seasons
 
 
 class Command(BaseCommand):
     help = "Import seasons into database."
 
-    def handle(self, *args, **options):
-        headers = dict()
-        headers["X-RapidAPI-Key"] = os.getenv("RAPID_API_KEY")
-        headers["X-RapidAPI-Host"] = "api-basketball.p.rapidapi.com"
-        response = requests.get(
-            url="https://api-basketball.p.rapidapi.com/seasons",
-            headers=headers,
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Only use the cached upstream responses.",
         )
 
+    def handle(self, *args, **options):
+        try:
+            response = get_client().get("seasons", offline=options["offline"])
+        except UpstreamOfflineError as error:
+            self.stdout.write(f"{error}")
+            return
+        except requests.RequestException:
+            self.stdout.write("Service Unavailable.")
+            return
+
         if response.status_code == 200:
             data = json.loads(response.text)
             if not data["results"]:
@@ -1,39 +1,54 @@
 # Built-in
 import json
-import os
 
 # Third-party
 import requests
 from django.core.management.base import BaseCommand
 
 # Local
+from core.upstream import UpstreamOfflineError, get_client
 from games.services import import_teams
 
 
 class Command(BaseCommand):
     help = "Import teams into database."
 
-    def handle(self, *args, **options):
-        headers = dict()
-        headers["X-RapidAPI-Key"] = os.getenv("RAPID_API_KEY")
-        headers["X-RapidAPI-Host"] = "api-basketball.p.rapidapi.com"
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Only use the cached upstream responses.",
+        )
 
+    def handle(self, *args, **options):
         # league & season are mandatory
         # season must be mandatory by this form '2019-2020'
         season = 2022
         league = 178  # US
-        response = requests.get(
-            url="https://api-basketball.p.rapidapi.com/teams",
-            headers=headers,
-            params={"league": league, "season": season},
-        )
+        try:
+            response = get_client().get(
+                "teams",
+                params={"league": league, "season": season},
+                offline=options["offline"],
+            )
+        except UpstreamOfflineError as error:
+            self.stdout.write(f"{error}")
+            return
+        except requests.RequestException:
+            self.stdout.write("Service Unavailable.")
+            return
 
         if response.status_code == 200:
             data = json.loads(response.text)
             if not data["results"]:
                 self.stdout.write("No results found.")
 
-            import_teams(data=data["response"], season=season, league=league)
+            import_teams(
+                data=data["response"],
+                season=season,
+                league=league,
+                source=f"teams:{league}:{season}",
+            )
             self.stdout.write("Done.")
 
         elif response.status_code == 400:
@@ -0,0 +1,29 @@
+# Built-in
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand
+
+# Local
+from games.calendar import rebuild_game_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-day calendar buckets from the games table, e.g. "
+        "after games were changed with raw SQL or a restore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Days recomputed per query.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        days = rebuild_game_days(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Done. {days} days rebuilt in {elapsed:.2f}s.")
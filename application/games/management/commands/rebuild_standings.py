@@ -0,0 +1,29 @@
+# Built-in
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand
+
+# Local
+from games.standings import rebuild_standings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the standings from the finished games, e.g. after games were "
+        "changed with raw SQL or a restore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Teams recounted per query.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild_standings(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Done. {rows} standings rebuilt in {elapsed:.2f}s.")
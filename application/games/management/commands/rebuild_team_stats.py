@@ -0,0 +1,42 @@
+# Built-in
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand, CommandError
+
+# Local
+from games.models import Season
+from games.stats import rebuild_team_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the team stats and head-to-head records from the finished "
+        "games, for backfills or after games were changed with raw SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--season",
+            type=int,
+            help="Season year to recount, every season by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Rows inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        season_id = None
+        if options["season"]:
+            try:
+                season_id = Season.objects.get(year=options["season"]).id
+            except Season.DoesNotExist:
+                raise CommandError(f"Season {options['season']} does not exist.")
+
+        started = time.perf_counter()
+        rows = rebuild_team_stats(season_id=season_id, batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Done. {rows} team seasons rebuilt in {elapsed:.2f}s.")
@@ -0,0 +1,54 @@
+# Built-in
+import datetime
+import time
+
+# Third-party
+from django.core.management.base import BaseCommand
+
+# Local
+from games.jobs import STALE_JOB_TIMEOUT, claim_next_import_job, process_import_job
+
+
+class Command(BaseCommand):
+    help = "Run the queued game import jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling for new jobs.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait before polling an empty queue again.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=STALE_JOB_TIMEOUT.total_seconds(),
+            help="Seconds without progress after which a running job is requeued.",
+        )
+
+    def handle(self, *args, **options):
+        stale_timeout = datetime.timedelta(seconds=options["stale_after"])
+        while True:
+            job = claim_next_import_job(stale_timeout)
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+                continue
+
+            self.stdout.write(f"Job {job.id}: importing {job.params}")
+            try:
+                process_import_job(job)
+            except Exception as error:
+                self.stderr.write(f"Job {job.id}: {error}")
+                continue
+            self.stdout.write(
+                f"Job {job.id}: {job.status}, {job.rows_inserted} inserted, "
+                f"{job.rows_updated} updated, {job.rows_skipped} skipped."
+            )
+        self.stdout.write("Done.")
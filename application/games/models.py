@@ -57,10 +57,259 @@ class Game(models.Model):
         Team, on_delete=models.PROTECT, related_name="away_teams"
     )
 
-    reference_id = models.IntegerField(help_text="Game ID")
+    reference_id = models.IntegerField(unique=True, help_text="Game ID")
     datetime = models.DateTimeField()
     status = models.CharField(max_length=100)
     scores = models.JSONField(blank=True)
+    # typed copies of the totals in `scores`, see games.scores
+    home_total = models.IntegerField(blank=True, null=True, editable=False)
+    away_total = models.IntegerField(blank=True, null=True, editable=False)
+    content_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Hash of the last imported datetime, status and scores",
+    )
 
     def __str__(self):
         return str(self.reference_id)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["country", "user", "-id"], name="game_country_user_idx"
+            ),
+            models.Index(
+                fields=["country", "-id"],
+                condition=models.Q(user__isnull=True),
+                name="game_country_unassigned_idx",
+            ),
+            # list filters, each one narrowed by a datetime range or ordered
+            # by datetime; ordering by id is served by the single-column FK
+            # indexes, which hold the rowid in order
+            models.Index(fields=["datetime"], name="game_datetime_idx"),
+            models.Index(
+                fields=["league", "datetime"], name="game_league_datetime_idx"
+            ),
+            models.Index(
+                fields=["season", "datetime"], name="game_season_datetime_idx"
+            ),
+            models.Index(
+                fields=["home_team", "datetime"], name="game_home_team_datetime_idx"
+            ),
+            models.Index(
+                fields=["away_team", "datetime"], name="game_away_team_datetime_idx"
+            ),
+            models.Index(
+                fields=["status", "datetime"], name="game_status_datetime_idx"
+            ),
+            # season wide score aggregates per team read the index alone
+            models.Index(
+                fields=["season", "home_team", "away_team", "home_total", "away_total"],
+                name="game_season_totals_idx",
+            ),
+        ]
+
+
+class GameScore(models.Model):
+    """
+    Points of one team of a game in one period, the normalized form of
+    Game.scores written by games.scores.store_game_scores.
+    """
+
+    class Sides(models.TextChoices):
+        HOME = "home", "Home"
+        AWAY = "away", "Away"
+
+    class Periods(models.TextChoices):
+        QUARTER_1 = "quarter_1", "Quarter 1"
+        QUARTER_2 = "quarter_2", "Quarter 2"
+        QUARTER_3 = "quarter_3", "Quarter 3"
+        QUARTER_4 = "quarter_4", "Quarter 4"
+        OVER_TIME = "over_time", "Over time"
+
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="periods")
+    # copied from the game so that season aggregates skip the join
+    season = models.ForeignKey(Season, on_delete=models.CASCADE)
+    team = models.ForeignKey(Team, on_delete=models.CASCADE)
+    side = models.CharField(max_length=4, choices=Sides.choices)
+    period = models.CharField(max_length=9, choices=Periods.choices)
+    points = models.PositiveSmallIntegerField()
+
+    def __str__(self):
+        return f"{self.game} {self.side} {self.period}: {self.points}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["game", "side", "period"],
+                name="gamescore_game_side_period_uniq",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["season", "team", "period", "points"],
+                name="gamescore_season_team_idx",
+            )
+        ]
+
+
+class GameDay(models.Model):
+    """
+    Games of one country on one day, so that a calendar is a range read.
+    """
+
+    country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    date = models.DateField()
+    games = models.JSONField(default=list, blank=True)
+    games_count = models.PositiveIntegerField(default=0)
+    unassigned_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.country} {self.date}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["country", "date"], name="gameday_country_date_uniq"
+            )
+        ]
+
+
+class Standing(models.Model):
+    """
+    Record of a team in the finished games of a league season.
+    """
+
+    league = models.ForeignKey(League, on_delete=models.CASCADE)
+    season = models.ForeignKey(Season, on_delete=models.CASCADE)
+    team = models.ForeignKey(Team, on_delete=models.CASCADE)
+    games_played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    points_for = models.PositiveIntegerField(default=0)
+    points_against = models.PositiveIntegerField(default=0)
+    home_wins = models.PositiveIntegerField(default=0)
+    home_losses = models.PositiveIntegerField(default=0)
+    away_wins = models.PositiveIntegerField(default=0)
+    away_losses = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.team} {self.wins}-{self.losses}"
+
+    @property
+    def differential(self) -> int:
+        return self.points_for - self.points_against
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["league", "season", "team"],
+                name="standing_league_season_team_uniq",
+            )
+        ]
+
+
+class TeamSeasonStats(models.Model):
+    """
+    Totals of a team over its finished games of a season.
+    """
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE)
+    season = models.ForeignKey(Season, on_delete=models.CASCADE)
+    games_played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    home_wins = models.PositiveIntegerField(default=0)
+    home_losses = models.PositiveIntegerField(default=0)
+    away_wins = models.PositiveIntegerField(default=0)
+    away_losses = models.PositiveIntegerField(default=0)
+    points_for = models.PositiveIntegerField(default=0)
+    points_against = models.PositiveIntegerField(default=0)
+    quarter_1 = models.PositiveIntegerField(default=0)
+    quarter_2 = models.PositiveIntegerField(default=0)
+    quarter_3 = models.PositiveIntegerField(default=0)
+    quarter_4 = models.PositiveIntegerField(default=0)
+    over_time = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.team} {self.season}"
+
+    class Meta:
+        verbose_name_plural = "team season stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["team", "season"], name="teamseasonstats_team_season_uniq"
+            )
+        ]
+
+
+class HeadToHead(models.Model):
+    """
+    Totals of a team over its finished games against one opponent in a season.
+    """
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE)
+    opponent = models.ForeignKey(
+        Team, on_delete=models.CASCADE, related_name="opponent_head_to_heads"
+    )
+    season = models.ForeignKey(Season, on_delete=models.CASCADE)
+    games_played = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    points_for = models.PositiveIntegerField(default=0)
+    points_against = models.PositiveIntegerField(default=0)
+    last_played = models.DateTimeField(null=True, blank=True, default=None)
+
+    def __str__(self):
+        return f"{self.team} - {self.opponent} {self.season}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["team", "opponent", "season"],
+                name="headtohead_team_opponent_season_uniq",
+            )
+        ]
+
+
+class ImportJob(models.Model):
+    class Statuses(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        FINISHED = "finished", "Finished"
+        FAILED = "failed", "Failed"
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        default=None,
+    )
+    params = models.JSONField(help_text="Query parameters of the upstream /games")
+    upsert = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20, choices=Statuses.choices, default=Statuses.PENDING
+    )
+    message = models.TextField(blank=True, default="")
+    rows_received = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True, default=None)
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        default=None,
+        help_text="Last sign of life of the worker running the job",
+    )
+    finished_at = models.DateTimeField(blank=True, null=True, default=None)
+
+    def __str__(self):
+        return f"{self.params} ({self.status})"
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "id"], name="importjob_status_idx")]
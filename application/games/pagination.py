@@ -0,0 +1,127 @@
+# Built-in
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+# Third-party
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class GamePagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that switches to keyset pagination when the
+    request carries a `cursor` query parameter (an empty one for the first
+    page). Keyset pages seek past the last row of the previous page and never
+    run a COUNT, so a deep page costs the same as the first one.
+    """
+
+    cursor_query_param = "cursor"
+    ordering_query_param = "ordering"
+    orderings = {
+        "-id": ("-id",),
+        "id": ("id",),
+        "-datetime": ("-datetime", "-id"),
+        "datetime": ("datetime", "id"),
+    }
+    default_ordering = "-id"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(request)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset.order_by(*self.ordering)[: self.limit + 1])
+        self.has_next = len(results) > self.limit
+        results = results[: self.limit]
+        self.next_position = (
+            [self.get_value(results[-1], field) for field in self.ordering]
+            if self.has_next
+            else None
+        )
+        return results
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(
+            self.ordering_query_param, self.default_ordering
+        )
+        return self.orderings.get(ordering, self.orderings[self.default_ordering])
+
+    def get_position_filter(self, position):
+        """
+        Build `(a, b) > (x, y)` for the current ordering as
+        `a > x OR (a = x AND b > y)`, flipping the comparison on descending
+        fields.
+        """
+        position_filter = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            position_filter |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        return position_filter
+
+    @staticmethod
+    def get_value(obj, field):
+        name = field.lstrip("-")
+        # model instances, or the rows of a `.values()` queryset
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return value
+
+    def encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            position = [
+                parse_datetime(value) if field.lstrip("-") == "datetime" else int(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
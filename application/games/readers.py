@@ -0,0 +1,213 @@
+# Built-in
+import codecs
+import json
+from typing import IO, Iterator
+
+
+class JSONStream:
+    """
+    Minimal incremental reader over a text or UTF-8 binary file: it decodes
+    one JSON value at a time from a sliding buffer, so only the value being
+    decoded is held in memory. `tell()` gives the position in the file, in
+    bytes for binary files, of the next character to read.
+    """
+
+    decoder = json.JSONDecoder()
+    # longest text a cut at the buffer end can leave undecodable, `-Infinity`
+    truncation_window = 16
+
+    def __init__(
+        self,
+        file: IO,
+        chunk_size: int = 1 << 16,
+        max_value_size: int = 1 << 26,
+        offset: int = 0,
+    ):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.max_value_size = max_value_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        # position in the file of the start of the buffer
+        self.offset = offset
+        self.binary = False
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+
+    def _read(self) -> str:
+        while True:
+            data = self.file.read(self.chunk_size)
+            if not isinstance(data, bytes):
+                return data
+            self.binary = True
+            text = self.utf8.decode(data, final=not data)
+            # a chunk may hold nothing but the start of a multibyte character
+            if text or not data:
+                return text
+
+    def _size(self, text: str) -> int:
+        return len(text.encode()) if self.binary else len(text)
+
+    def _fill(self):
+        data = self._read()
+        if not data:
+            self.eof = True
+            return
+        pos, self.pos = self.pos, 0
+        self.offset += self._size(self.buffer[:pos])
+        self.buffer = self.buffer[pos:] + data
+
+    def tell(self) -> int:
+        return self.offset + self._size(self.buffer[: self.pos])
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise json.JSONDecodeError("Unexpected end of file", self.buffer, 0)
+            self._fill()
+
+    def consume(self, expected: str = None) -> str:
+        char = self.peek()
+        if expected is not None and char != expected:
+            raise json.JSONDecodeError(
+                f"Expected {expected!r}, got {char!r}", self.buffer, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def next_item(self, closing: str) -> bool:
+        """
+        Consume the separator after a container item and tell whether another
+        item follows.
+        """
+        char = self.consume()
+        if char == closing:
+            return False
+        if char != ",":
+            raise json.JSONDecodeError(
+                f"Expected ',' or {closing!r}, got {char!r}", self.buffer, self.pos
+            )
+        return True
+
+    def may_be_truncated(self, error: json.JSONDecodeError) -> bool:
+        """
+        Tell whether more data could fix a decoding error: the value was cut
+        at the end of the buffer, inside a literal or a string. Any other
+        error is in the file and is raised before reading further.
+        """
+        if len(self.buffer) - self.pos > self.max_value_size:
+            raise json.JSONDecodeError(
+                f"Value larger than {self.max_value_size} characters",
+                self.buffer,
+                self.pos,
+            )
+        return error.msg.startswith("Unterminated string") or (
+            len(self.buffer) - error.pos < self.truncation_window
+        )
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as error:
+                if self.eof or not self.may_be_truncated(error):
+                    raise
+                self._fill()
+                continue
+            # a value ending right at the buffer edge may be a truncated number
+            if end < len(self.buffer) or self.eof:
+                self.pos = end
+                return value
+            self._fill()
+
+
+class EnvelopeReader:
+    """
+    The items of the `key` array of an API envelope, e.g.
+    `{"get": "games", ..., "response": [{...}, {...}]}`, one at a time.
+    `offset` is the position in the file right after the last item read;
+    `seek()` to it on a new reader to resume after that item without parsing
+    the file again. Open the file in binary mode for byte offsets.
+    """
+
+    def __init__(self, file: IO, key: str = "response", chunk_size: int = 1 << 16):
+        self.file = file
+        self.key = key
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.resumed = False
+
+    def seek(self, offset: int):
+        self.file.seek(offset)
+        self.offset = offset
+        self.resumed = True
+
+    def __iter__(self) -> Iterator[dict]:
+        stream = JSONStream(self.file, chunk_size=self.chunk_size, offset=self.offset)
+        if self.resumed:
+            # right after an item of the array
+            if stream.next_item("]"):
+                yield from self._items(stream)
+            return
+
+        stream.consume("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            name = stream.decode()
+            stream.consume(":")
+            if name == self.key:
+                stream.consume("[")
+                if stream.peek() == "]":
+                    stream.consume()
+                else:
+                    yield from self._items(stream)
+            else:
+                stream.decode()
+            if not stream.next_item("}"):
+                return
+
+    def _items(self, stream: JSONStream) -> Iterator[dict]:
+        while True:
+            item = stream.decode()
+            self.offset = stream.tell()
+            yield item
+            if not stream.next_item("]"):
+                return
+
+
+class NDJSONReader:
+    """
+    The items of a file with one JSON value per line, with `offset` and
+    `seek()` like EnvelopeReader.
+    """
+
+    def __init__(self, file: IO):
+        self.file = file
+        self.offset = 0
+
+    def seek(self, offset: int):
+        self.file.seek(offset)
+        self.offset = offset
+
+    def __iter__(self) -> Iterator[dict]:
+        for line in self.file:
+            self.offset += len(line)
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def iter_envelope(
+    file: IO, key: str = "response", chunk_size: int = 1 << 16
+) -> Iterator[dict]:
+    return iter(EnvelopeReader(file, key=key, chunk_size=chunk_size))
+
+
+def iter_ndjson(file: IO) -> Iterator[dict]:
+    return iter(NDJSONReader(file))
@@ -1,8 +1,11 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
 from accounts.custom_signal import user_after_save
 from accounts.models import CustomUser
-from games.models import Game
+from core.cache import bump_namespace
+from games.models import Game, League, Season, Team
+from games.services import games_changed, get_game_keys
 
 
 @receiver(user_after_save, sender=CustomUser, dispatch_uid="user_after_save")
@@ -10,6 +13,38 @@ def user_after_save_update_games(sender, instance, *args, **kwargs):
     """
     Remove user from games if a certain country was removed from user.
     """
-    Game.objects.filter(
+    games = Game.objects.filter(
         user=instance, league__country_id__in=kwargs["country_ids"]
-    ).update(user=None)
+    )
+    keys = get_game_keys(games)
+    games.update(user=None)
+    games_changed(keys, stats=False)
+
+
+@receiver(pre_delete, sender=CustomUser, dispatch_uid="user_deleting_games_days")
+def user_deleting_collect_game_days(sender, instance, **kwargs):
+    # the games are unassigned by SET_NULL, only known before the delete
+    instance._game_keys = get_game_keys(Game.objects.filter(user=instance))
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid="user_deleted_game_days")
+def user_deleted_refresh_game_days(sender, instance, **kwargs):
+    games_changed(getattr(instance, "_game_keys", ()), stats=False)
+
+
+@receiver(post_save, sender=Season, dispatch_uid="season_saved")
+@receiver(post_delete, sender=Season, dispatch_uid="season_deleted")
+def season_changed(sender, **kwargs):
+    bump_namespace("seasons")
+
+
+@receiver(post_save, sender=League, dispatch_uid="league_saved")
+@receiver(post_delete, sender=League, dispatch_uid="league_deleted")
+def league_changed(sender, **kwargs):
+    bump_namespace("leagues")
+
+
+@receiver(post_save, sender=Team, dispatch_uid="team_saved")
+@receiver(post_delete, sender=Team, dispatch_uid="team_deleted")
+def team_changed(sender, **kwargs):
+    bump_namespace("teams")
@@ -0,0 +1,101 @@
+# Built-in
+from typing import Callable, Iterable, Optional
+
+# Third-party
+from django.db import transaction
+
+# Local
+from games.models import Game, GameScore
+
+SIDES = tuple(GameScore.Sides.values)
+PERIODS = tuple(GameScore.Periods.values)
+# fields of Game the totals and the period rows are built from
+SCORE_SOURCE_FIELDS = ("scores", "season", "home_team", "away_team")
+
+
+def get_score_total(scores, side: str) -> Optional[int]:
+    try:
+        return scores[side]["total"]
+    except (KeyError, TypeError):
+        return None
+
+
+def get_score_totals(scores) -> dict:
+    """
+    The typed total columns of `scores`, e.g. for an UPDATE.
+    """
+    return {
+        "home_total": get_score_total(scores, "home"),
+        "away_total": get_score_total(scores, "away"),
+    }
+
+
+def set_score_totals(game: Game) -> Game:
+    """
+    Copy the totals of `game.scores` to the typed columns, without saving.
+    """
+    game.home_total = get_score_total(game.scores, "home")
+    game.away_total = get_score_total(game.scores, "away")
+    return game
+
+
+def build_game_scores(game: Game) -> list:
+    periods = []
+    for side in SIDES:
+        try:
+            side_scores = game.scores[side] or {}
+        except (KeyError, TypeError):
+            continue
+        for period in PERIODS:
+            if side_scores.get(period) is not None:
+                periods.append(
+                    GameScore(
+                        game_id=game.pk,
+                        season_id=game.season_id,
+                        team_id=getattr(game, f"{side}_team_id"),
+                        side=side,
+                        period=period,
+                        points=side_scores[period],
+                    )
+                )
+    return periods
+
+
+def store_game_scores(games: Iterable[Game], replace: bool = True, batch_size=500):
+    """
+    Write the period rows of saved games, replacing theirs unless `replace=False`.
+    """
+    games = list(games)
+    if not games:
+        return
+    if replace:
+        GameScore.objects.filter(game_id__in=[game.pk for game in games]).delete()
+    GameScore.objects.bulk_create(
+        [period for game in games for period in build_game_scores(game)],
+        batch_size=batch_size,
+    )
+
+
+def refresh_game_scores(
+    queryset, batch_size: int = 500, on_batch: Callable[[list], None] = None
+) -> int:
+    """
+    Rewrite the totals and period rows of `queryset` in committed batches.
+    """
+    games = queryset.order_by("pk").only(*SCORE_SOURCE_FIELDS, "league", "status")
+    refreshed = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = [
+                set_score_totals(game)
+                for game in games.filter(pk__gt=last_pk)[:batch_size]
+            ]
+            if not batch:
+                return refreshed
+            Game.objects.bulk_update(batch, ["home_total", "away_total"])
+            store_game_scores(batch, batch_size=batch_size)
+            if on_batch is not None:
+                on_batch(batch)
+        refreshed += len(batch)
+        last_pk = batch[-1].pk
@@ -6,7 +6,20 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 # Local
-from games.models import Game, League, Season, Team
+from core.serializers import CountrySerializer
+from games.exports import EXPORT_FORMATS, get_default_export_format, pyarrow
+from games.models import (
+    Game,
+    HeadToHead,
+    ImportJob,
+    League,
+    Season,
+    Standing,
+    Team,
+    TeamSeasonStats,
+)
+from games.pagination import GamePagination
+from games.scores import PERIODS
 
 
 class SeasonSerializer(serializers.ModelSerializer):
@@ -36,6 +49,12 @@ class ImportGameSerializer(serializers.Serializer):
         required=False, write_only=True, help_text="2019-11-26"
     )
     team = serializers.IntegerField(required=False, write_only=True)
+    upsert = serializers.BooleanField(
+        required=False,
+        default=False,
+        write_only=True,
+        help_text="Refresh the status and scores of games already imported",
+    )
 
     @staticmethod
     def validate_date(value):
@@ -63,7 +82,243 @@ class ImportGameSerializer(serializers.Serializer):
         return value
 
 
-class AdminGameSerializer(serializers.ModelSerializer):
+class AssignGamesSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        max_length=100,
+        write_only=True,
+        help_text="Only claim among these games",
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        default=10,
+        min_value=1,
+        max_value=100,
+        write_only=True,
+        help_text="Maximum number of games to claim",
+    )
+
+
+class GameCalendarSerializer(serializers.Serializer):
+    date_from = serializers.DateField(
+        required=False, help_text="First day, today by default"
+    )
+    days = serializers.IntegerField(
+        required=False, default=7, min_value=1, max_value=31
+    )
+    scope = serializers.ChoiceField(
+        choices=["assigned", "unassigned"],
+        required=False,
+        default="assigned",
+        help_text="My games or the open games of my countries",
+    )
+
+
+class StandingFilterSerializer(serializers.Serializer):
+    league = serializers.IntegerField()
+    season = serializers.IntegerField()
+
+
+class StandingSerializer(serializers.ModelSerializer):
+    team_name = serializers.CharField(source="team.name", read_only=True)
+    win_percentage = serializers.SerializerMethodField()
+    differential = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Standing
+        fields = [
+            "team",
+            "team_name",
+            "games_played",
+            "wins",
+            "losses",
+            "win_percentage",
+            "points_for",
+            "points_against",
+            "differential",
+            "home_wins",
+            "home_losses",
+            "away_wins",
+            "away_losses",
+        ]
+
+    def get_win_percentage(self, obj) -> float:
+        return round(obj.wins / obj.games_played, 3)
+
+
+class TeamStatsFilterSerializer(serializers.Serializer):
+    team = serializers.IntegerField()
+    season = serializers.IntegerField(required=False)
+
+
+class HeadToHeadFilterSerializer(TeamStatsFilterSerializer):
+    opponent = serializers.IntegerField()
+
+
+class TeamSeasonStatsSerializer(serializers.ModelSerializer):
+    averages = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TeamSeasonStats
+        fields = [
+            "team",
+            "season",
+            "games_played",
+            "wins",
+            "losses",
+            "home_wins",
+            "home_losses",
+            "away_wins",
+            "away_losses",
+            "points_for",
+            "points_against",
+            "averages",
+        ]
+
+    def get_averages(self, obj) -> dict:
+        """
+        Points per game, overall and per quarter.
+        """
+        fields = ("points_for", "points_against") + PERIODS
+        return {
+            field: round(getattr(obj, field) / obj.games_played, 1) for field in fields
+        }
+
+
+class HeadToHeadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = HeadToHead
+        fields = [
+            "season",
+            "games_played",
+            "wins",
+            "losses",
+            "points_for",
+            "points_against",
+            "last_played",
+        ]
+
+
+class GameFilterSerializer(serializers.Serializer):
+    league = serializers.IntegerField(required=False)
+    season = serializers.IntegerField(required=False)
+    team = serializers.IntegerField(required=False, help_text="Home or away team")
+    status = serializers.CharField(required=False)
+    date_from = serializers.DateField(required=False, help_text="2019-11-26")
+    date_to = serializers.DateField(required=False, help_text="2019-11-26")
+    ordering = serializers.ChoiceField(
+        choices=list(GamePagination.orderings), required=False
+    )
+
+
+class GameExportSerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(
+        choices=list(EXPORT_FORMATS),
+        required=False,
+        help_text="parquet when pyarrow is installed, csv (gzip) otherwise",
+    )
+
+    def validate_file_format(self, value):
+        if value == "parquet" and pyarrow is None:
+            raise ValidationError("Parquet exports are not available.")
+        return value
+
+    def validate(self, attrs):
+        attrs.setdefault("file_format", get_default_export_format())
+        return attrs
+
+
+class BulkGameFilterSerializer(GameFilterSerializer):
+    country = serializers.IntegerField(required=False)
+    user = serializers.IntegerField(
+        required=False, allow_null=True, help_text="null for unassigned games"
+    )
+    ordering = None
+
+
+class BulkGameSelectionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=10000
+    )
+    filter = BulkGameFilterSerializer(required=False)
+
+    def validate(self, attrs):
+        if not attrs.get("ids") and not attrs.get("filter"):
+            raise ValidationError("Select the games with ids or a filter.")
+        return attrs
+
+
+class BulkGameChangesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Game
+        fields = ["user", "datetime", "status", "scores"]
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "status",
+            "params",
+            "upsert",
+            "message",
+            "progress",
+            "rows_received",
+            "rows_inserted",
+            "rows_updated",
+            "rows_skipped",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+    @staticmethod
+    def get_progress(obj) -> float:
+        if obj.status == ImportJob.Statuses.FINISHED:
+            return 1.0
+        if not obj.rows_received:
+            return 0.0
+        processed = obj.rows_inserted + obj.rows_updated + obj.rows_skipped
+        return round(processed / obj.rows_received, 4)
+
+
+class ExpandGameMixin:
+    """
+    Embed the related objects named in the `?expand=` query parameter
+    (teams, league, country, season) instead of their ids.
+    """
+
+    expand_query_param = "expand"
+    expandable_fields = {
+        "teams": {"home_team": TeamSerializer, "away_team": TeamSerializer},
+        "league": {"league": LeagueSerializer},
+        "country": {"country": CountrySerializer},
+        "season": {"season": SeasonSerializer},
+    }
+
+    @classmethod
+    def get_expanded_fields(cls, request) -> dict:
+        if request is None:
+            return {}
+        expand = request.query_params.get(cls.expand_query_param, "")
+        fields = {}
+        for name in expand.split(","):
+            fields.update(cls.expandable_fields.get(name.strip(), {}))
+        return fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        expanded_fields = self.get_expanded_fields(self.context.get("request"))
+        for field, serializer_class in expanded_fields.items():
+            data[field] = serializer_class(getattr(instance, field)).data
+        return data
+
+
+class AdminGameSerializer(ExpandGameMixin, serializers.ModelSerializer):
     class Meta:
         model = Game
         fields = [
@@ -81,7 +336,7 @@ class AdminGameSerializer(serializers.ModelSerializer):
         ]
 
 
-class UserGameSerializer(serializers.ModelSerializer):
+class UserGameSerializer(ExpandGameMixin, serializers.ModelSerializer):
     class Meta:
         model = Game
         fields = [
@@ -1,47 +1,324 @@
 import datetime
+import hashlib
+import json
 import zoneinfo
+from typing import Iterable, Set, Tuple
 
+from django.db.models import QuerySet
+from django.db.models.functions import TruncDate
+
+from core.cache import bump_namespace
 from core.models import Country
+from core.services import import_in_chunks, payload_fingerprint
+from games.calendar import get_game_day, refresh_game_days
 from games.models import Game, League, Season, Team
+from games.scores import set_score_totals, store_game_scores
+from games.standings import FINISHED_GAME_STATUSES, StandingKey
+from games.stats import refresh_game_stats
 
+# (country, day, league, season, home team, away team, finished) of a game
+GameKey = Tuple[int, datetime.date, int, int, int, int, bool]
+GAME_KEY_FIELDS = (
+    "country",
+    "datetime",
+    "league",
+    "season",
+    "home_team",
+    "away_team",
+    "status",
+)
 
-def import_games(data: list):
-    games = []
-    db_countries = Country.objects.all()
-    db_seasons = Season.objects.all()
-    db_leagues = League.objects.all()
-    db_teams = Team.objects.all()
-    db_games = Game.objects.all()
+
+def _season_year(value) -> int:
+    if isinstance(value, str):
+        return int(value.split("-")[0])
+    return value
+
+
+def _parse_game_datetime(game_data: dict) -> datetime.datetime:
+    return datetime.datetime.strptime(
+        f"{game_data['date'].split('T')[0]} {game_data['time']}",
+        "%Y-%m-%d %H:%M",
+    ).replace(tzinfo=zoneinfo.ZoneInfo("UTC"))
+
+
+def game_content_hash(game_data: dict) -> str:
+    """
+    Hash of the upstream fields that change while a game is played, used to
+    skip writes when a re-import brings nothing new.
+    """
+    content = json.dumps(
+        [
+            game_data["date"],
+            game_data["time"],
+            game_data["status"],
+            game_data["scores"],
+        ],
+        sort_keys=True,
+    )
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def _map_by(queryset, field: str, values) -> dict:
+    """
+    Fetch the rows whose `field` is in `values` with a single IN query and map
+    them by that field. On duplicates the lowest pk wins, like `.first()`.
+    """
+    mapping = {}
+    for obj in queryset.filter(**{f"{field}__in": set(values)}).order_by("-pk"):
+        mapping[getattr(obj, field)] = obj
+    return mapping
+
+
+def resolve_game_references(data: list) -> dict:
+    """
+    Prefetch every Country, Season, League and Team referenced by a games
+    payload, plus the pk and content hash of the games already stored, so that
+    the import needs a fixed number of queries whatever the payload size.
+    """
+    return {
+        "countries": _map_by(
+            Country.objects.all(),
+            "reference_id",
+            (game_data["country"]["id"] for game_data in data),
+        ),
+        "seasons": _map_by(
+            Season.objects.all(),
+            "year",
+            (_season_year(game_data["league"]["season"]) for game_data in data),
+        ),
+        "leagues": _map_by(
+            League.objects.all(),
+            "reference_id",
+            (game_data["league"]["id"] for game_data in data),
+        ),
+        "teams": _map_by(
+            Team.objects.all(),
+            "reference_id",
+            (
+                team_data["id"]
+                for game_data in data
+                for team_data in game_data["teams"].values()
+            ),
+        ),
+        "games": {
+            reference_id: (pk, content_hash)
+            for reference_id, pk, content_hash in Game.objects.filter(
+                reference_id__in={game_data["id"] for game_data in data}
+            ).values_list("reference_id", "pk", "content_hash")
+        },
+    }
+
+
+def _game_key_value(field: str, value):
+    if field == "datetime":
+        return get_game_day(value)
+    if field == "status":
+        return value in FINISHED_GAME_STATUSES
+    return getattr(value, "pk", value)
+
+
+def get_game_keys(games) -> Set[GameKey]:
+    """
+    The keys of saved games, or of the games of a queryset in one query.
+    """
+    if isinstance(games, QuerySet):
+        rows = (
+            games.annotate(day=TruncDate("datetime"))
+            .order_by()
+            .values_list(
+                "country_id",
+                "day",
+                "league_id",
+                "season_id",
+                "home_team_id",
+                "away_team_id",
+                "status",
+            )
+            .distinct()
+        )
+        return {(*row[:-1], row[-1] in FINISHED_GAME_STATUSES) for row in rows}
+    return {
+        (
+            game.country_id,
+            get_game_day(game.datetime),
+            game.league_id,
+            game.season_id,
+            game.home_team_id,
+            game.away_team_id,
+            game.status in FINISHED_GAME_STATUSES,
+        )
+        for game in games
+    }
+
+
+def get_changed_game_keys(keys: Iterable[GameKey], changes: dict) -> Set[GameKey]:
+    """
+    The keys of games after an UPDATE of `changes`, from their keys before.
+    """
+    replacements = {
+        index: _game_key_value(field, changes[field])
+        for index, field in enumerate(GAME_KEY_FIELDS)
+        if field in changes
+    }
+    return {
+        tuple(replacements.get(index, value) for index, value in enumerate(key))
+        for key in keys
+    }
+
+
+def games_changed(
+    old_keys: Iterable[GameKey] = (),
+    new_keys: Iterable[GameKey] = (),
+    created: Iterable[Game] = (),
+    rescored: Iterable[Game] = (),
+    stats: bool = True,
+    stat_keys: Set[StandingKey] = None,
+):
+    """
+    Bring the tables built from games up to date after games were created,
+    changed or deleted: the period rows of the `created` and `rescored`
+    games, then the calendar days and, unless only the users of the games
+    changed (`stats=False`), the standings and stats of the finished games,
+    for the keys the games had before and have after the change. Imports pass
+    a `stat_keys` set collecting the standing keys, refreshed once at the end.
+    """
+    store_game_scores(created, replace=False)
+    store_game_scores(rescored)
+    keys = set(old_keys) | set(new_keys)
+    refresh_game_days({(country_id, day) for country_id, day, *_ in keys})
+    if stats:
+        standing_keys = {
+            (league_id, season_id, team_id)
+            for _, _, league_id, season_id, *team_ids, finished in keys
+            if finished
+            for team_id in team_ids
+        }
+        if stat_keys is None:
+            refresh_game_stats(standing_keys)
+        else:
+            stat_keys |= standing_keys
+
+
+def sync_games(
+    data: list, upsert: bool = False, stat_keys: Set[StandingKey] = None
+) -> dict:
+    """
+    Insert the games that are not stored yet. With `upsert` the stored games
+    whose datetime, status or scores changed upstream are updated as well.
+    Games that did not change are never written. With `stat_keys` the
+    standings and stats are left to the caller, see games_changed.
+    """
+    references = resolve_game_references(data)
+    countries = references["countries"]
+    seasons = references["seasons"]
+    leagues = references["leagues"]
+    teams = references["teams"]
+    existing = references["games"]
+
+    created = []
+    updated = []
+    seen = set()
     for game_data in data:
-        if not db_games.filter(reference_id=game_data["id"]).exists():
-            games.append(
+        # the payload may repeat a game, only the first occurrence is kept
+        if game_data["id"] in seen:
+            continue
+        seen.add(game_data["id"])
+
+        content_hash = game_content_hash(game_data)
+        if game_data["id"] in existing:
+            pk, stored_hash = existing[game_data["id"]]
+            if upsert and content_hash != stored_hash:
+                updated.append(
+                    set_score_totals(
+                        Game(
+                            pk=pk,
+                            datetime=_parse_game_datetime(game_data),
+                            status=game_data["status"]["long"],
+                            scores=game_data["scores"],
+                            content_hash=content_hash,
+                        )
+                    )
+                )
+            continue
+
+        created.append(
+            set_score_totals(
                 Game(
-                    country=db_countries.filter(
-                        reference_id=game_data["country"]["id"]
-                    ).first(),
-                    season=db_seasons.filter(
-                        year=game_data["league"]["season"]
-                    ).first(),
-                    league=db_leagues.filter(
-                        reference_id=game_data["league"]["id"]
-                    ).first(),
+                    country=countries.get(game_data["country"]["id"]),
+                    season=seasons.get(_season_year(game_data["league"]["season"])),
+                    league=leagues.get(game_data["league"]["id"]),
                     reference_id=game_data["id"],
-                    datetime=datetime.datetime.strptime(
-                        f"{game_data['date'].split('T')[0]} {game_data['time']}",
-                        "%Y-%m-%d %H:%M",
-                    ).replace(tzinfo=zoneinfo.ZoneInfo("UTC")),
+                    datetime=_parse_game_datetime(game_data),
                     status=game_data["status"]["long"],
-                    home_team=db_teams.filter(
-                        reference_id=game_data["teams"]["home"]["id"]
-                    ).first(),
-                    away_team=db_teams.filter(
-                        reference_id=game_data["teams"]["away"]["id"]
-                    ).first(),
+                    home_team=teams.get(game_data["teams"]["home"]["id"]),
+                    away_team=teams.get(game_data["teams"]["away"]["id"]),
                     scores=game_data["scores"],
+                    content_hash=content_hash,
                 )
             )
+        )
+
+    # the keys the updated games leave, the teams and season never change
+    old_keys = set()
+    if updated:
+        stored = {
+            stored_game.pk: stored_game
+            for stored_game in Game.objects.filter(
+                pk__in=[game.pk for game in updated]
+            ).only(*GAME_KEY_FIELDS)
+        }
+        for game in updated:
+            stored_game = stored[game.pk]
+            old_keys |= get_game_keys([stored_game])
+            for field in ("country", "league", "season", "home_team", "away_team"):
+                setattr(game, f"{field}_id", getattr(stored_game, f"{field}_id"))
+
+    Game.objects.bulk_create(created, batch_size=100)
+    Game.objects.bulk_update(
+        updated,
+        ["datetime", "status", "scores", "content_hash", "home_total", "away_total"],
+        batch_size=100,
+    )
+    games_changed(
+        old_keys,
+        get_game_keys(created + updated),
+        created=created,
+        rescored=updated,
+        stat_keys=stat_keys,
+    )
+    return {
+        "created": len(created),
+        "updated": len(updated),
+        "skipped": len(seen) - len(created) - len(updated),
+    }
+
 
-    Game.objects.bulk_create(games, batch_size=100)
+def games_source(params: dict) -> str:
+    """
+    Checkpoint source of an upstream /games request.
+    """
+    return f"games:{json.dumps(params, sort_keys=True)}"
+
+
+def import_games(
+    data: list, upsert: bool = False, source: str = None, chunk_size: int = 500
+):
+    """
+    Import the games chunk by chunk, each chunk in its own transaction. With a
+    `source` the import is checkpointed and a rerun resumes where it stopped.
+    The standings and stats are refreshed once, after the last chunk.
+    """
+    stat_keys = set()
+    import_in_chunks(
+        data,
+        lambda chunk: sync_games(data=chunk, upsert=upsert, stat_keys=stat_keys),
+        source=source,
+        fingerprint=payload_fingerprint(data),
+        chunk_size=chunk_size,
+        pending=stat_keys,
+        finish=refresh_game_stats,
+    )
     return True
 
 
@@ -54,77 +331,116 @@ def import_seasons(data: dict):
             print(f"{k} added")
 
     Season.objects.bulk_create(seasons)
+    bump_namespace("seasons")
     return True
 
 
-def import_leagues(data: list):
-    db_countries = Country.objects.all()
-    db_seasons = Season.objects.all()
-    db_leagues = League.objects.all()
+def _import_leagues_chunk(data: list) -> dict:
+    pairs = [
+        (league_data, _season_year(season_data["season"]))
+        for league_data in data
+        for season_data in league_data["seasons"]
+    ]
+    countries = _map_by(
+        Country.objects.all(),
+        "reference_id",
+        (league_data["country"]["id"] for league_data, _ in pairs),
+    )
+    seasons = _map_by(Season.objects.all(), "year", (year for _, year in pairs))
+    existing = set(
+        League.objects.filter(
+            reference_id__in={league_data["id"] for league_data, _ in pairs}
+        ).values_list("reference_id", "season__year", "country__reference_id")
+    )
 
     leagues = []
-    idx = 0
-    for league_data in data:
-        for season_data in league_data["seasons"]:
-            year = season_data["season"]
-            if isinstance(year, str):
-                year = int(year.split("-")[0])
-
-            if not db_leagues.filter(
+    for league_data, year in pairs:
+        key = (league_data["id"], year, league_data["country"]["id"])
+        if key in existing:
+            continue
+        existing.add(key)
+        leagues.append(
+            League(
+                country=countries.get(league_data["country"]["id"]),
+                season=seasons.get(year),
                 reference_id=league_data["id"],
-                season__year=year,
-                country__reference_id=league_data["country"]["id"],
-            ).exists():
-                leagues.append(
-                    League(
-                        country=db_countries.filter(
-                            reference_id=league_data["country"]["id"]
-                        ).first(),
-                        season=db_seasons.filter(year=year).first(),
-                        reference_id=league_data["id"],
-                        name=league_data["name"],
-                        type=league_data["type"],
-                    )
-                )
-                idx += 1
-                print(
-                    f"{idx}. "
-                    f'{league_data["name"]} - '
-                    f'{season_data["season"]} - '
-                    f'{league_data["country"]["id"]} added'
-                )
+                name=league_data["name"],
+                type=league_data["type"],
+            )
+        )
+
     League.objects.bulk_create(leagues)
+    print(f"{len(leagues)} leagues added")
+    # bulk_create sends no post_save
+    bump_namespace("leagues")
+    return {"created": len(leagues)}
+
+
+def import_leagues(data: list, source: str = None, chunk_size: int = 500):
+    import_in_chunks(
+        data,
+        _import_leagues_chunk,
+        source=source,
+        fingerprint=payload_fingerprint(data),
+        chunk_size=chunk_size,
+    )
     return True
 
 
-def import_teams(data: list, season: int, league: 178):
+def _import_teams_chunk(data: list, season: int, league: int) -> dict:
     # sezonul are nevoie de liga, liga nu are nevoie de sezon
-    db_countries = Country.objects.all()
-    db_seasons = Season.objects.all()
-    db_leagues = League.objects.all()
-    db_teams = Team.objects.all()
-    teams = []
-
-    for idx, team_data in enumerate(data, start=1):
-        if not db_teams.filter(
-            reference_id=team_data["id"],
+    countries = _map_by(
+        Country.objects.all(),
+        "reference_id",
+        (team_data["country"]["id"] for team_data in data),
+    )
+    db_league = (
+        League.objects.select_related("season")
+        .filter(reference_id=league, season__year=season)
+        .first()
+    )
+    existing = set(
+        Team.objects.filter(
+            reference_id__in={team_data["id"] for team_data in data},
             season__year=season,
             league__reference_id=league,
-        ).exists():
-            teams.append(
-                Team(
-                    country=db_countries.filter(
-                        reference_id=team_data["country"]["id"]
-                    ).first(),
-                    season=db_seasons.filter(year=season).first(),
-                    league=db_leagues.filter(
-                        reference_id=league, season__year=season
-                    ).first(),
-                    reference_id=team_data["id"],
-                    name=team_data["name"],
-                )
+        ).values_list("reference_id", flat=True)
+    )
+
+    teams = []
+    for team_data in data:
+        if team_data["id"] in existing:
+            continue
+        existing.add(team_data["id"])
+        teams.append(
+            Team(
+                country=countries.get(team_data["country"]["id"]),
+                season=db_league.season if db_league else None,
+                league=db_league,
+                reference_id=team_data["id"],
+                name=team_data["name"],
             )
-            print(f'{idx}. {team_data["name"]} added')
+        )
+
+    Team.objects.bulk_create(teams)
+    print(f"{len(teams)} teams added")
+    # bulk_create sends no post_save
+    bump_namespace("teams")
+    return {"created": len(teams)}
+
 
-    Team.objects.bulk_create(teams, batch_size=100)
+def import_teams(
+    data: list,
+    season: int,
+    league: 178,
+    source: str = None,
+    chunk_size: int = 500,
+):
+    import_in_chunks(
+        data,
+        lambda chunk: _import_teams_chunk(chunk, season=season, league=league),
+        source=source,
+        fingerprint=payload_fingerprint(data),
+        chunk_size=chunk_size,
+    )
     return True
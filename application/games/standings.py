@@ -0,0 +1,123 @@
+# Built-in
+from collections import defaultdict
+from typing import Iterable, Set, Tuple
+
+# Third-party
+from django.db.models import Q
+
+# Local
+from games.models import Game, Standing
+
+# long names of the upstream FT and AOT statuses
+FINISHED_GAME_STATUSES = ("Game Finished", "After Over Time")
+
+StandingKey = Tuple[int, int, int]
+
+
+def get_standing_keys(queryset) -> Set[StandingKey]:
+    """
+    The (league, season, team) rows holding the games of `queryset`.
+    """
+    keys = set()
+    for league_id, season_id, home_team_id, away_team_id in (
+        queryset.order_by()
+        .values_list("league_id", "season_id", "home_team_id", "away_team_id")
+        .distinct()
+    ):
+        keys.add((league_id, season_id, home_team_id))
+        keys.add((league_id, season_id, away_team_id))
+    return keys
+
+
+def refresh_standings(keys: Iterable[StandingKey], batch_size: int = 500):
+    """
+    Recount the given (league, season, team) rows from their finished games.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    teams_by_league_season = defaultdict(set)
+    for league_id, season_id, team_id in keys:
+        teams_by_league_season[(league_id, season_id)].add(team_id)
+    games_filter = Q()
+    for (league_id, season_id), team_ids in teams_by_league_season.items():
+        games_filter |= Q(league_id=league_id, season_id=season_id) & (
+            Q(home_team_id__in=team_ids) | Q(away_team_id__in=team_ids)
+        )
+
+    standings = {
+        key: Standing(league_id=key[0], season_id=key[1], team_id=key[2])
+        for key in keys
+    }
+    games = Game.objects.filter(
+        games_filter,
+        status__in=FINISHED_GAME_STATUSES,
+        home_total__isnull=False,
+        away_total__isnull=False,
+    ).values_list(
+        "league_id",
+        "season_id",
+        "home_team_id",
+        "away_team_id",
+        "home_total",
+        "away_total",
+    )
+    for league_id, season_id, home_team_id, away_team_id, home, away in games:
+        for team_id, scored, conceded, at_home in (
+            (home_team_id, home, away, True),
+            (away_team_id, away, home, False),
+        ):
+            standing = standings.get((league_id, season_id, team_id))
+            if standing is None:
+                continue
+            won, lost = int(scored > conceded), int(scored < conceded)
+            standing.games_played += 1
+            standing.points_for += scored
+            standing.points_against += conceded
+            standing.wins += won
+            standing.losses += lost
+            if at_home:
+                standing.home_wins += won
+                standing.home_losses += lost
+            else:
+                standing.away_wins += won
+                standing.away_losses += lost
+
+    Standing.objects.bulk_create(
+        [standing for standing in standings.values() if standing.games_played],
+        update_conflicts=True,
+        unique_fields=["league", "season", "team"],
+        update_fields=[
+            "games_played",
+            "wins",
+            "losses",
+            "points_for",
+            "points_against",
+            "home_wins",
+            "home_losses",
+            "away_wins",
+            "away_losses",
+        ],
+        batch_size=batch_size,
+    )
+    empty = Q()
+    for (league_id, season_id, team_id), standing in standings.items():
+        if not standing.games_played:
+            empty |= Q(league_id=league_id, season_id=season_id, team_id=team_id)
+    if empty:
+        Standing.objects.filter(empty).delete()
+
+
+def rebuild_standings(batch_size: int = 500) -> int:
+    """
+    Recount every standing from scratch.
+    """
+    keys = sorted(
+        get_standing_keys(Game.objects.filter(status__in=FINISHED_GAME_STATUSES))
+    )
+    Standing.objects.all().delete()
+    for start in range(0, len(keys), batch_size):
+        end = start + batch_size
+        refresh_standings(keys[start:end], batch_size=batch_size)
+    return Standing.objects.count()
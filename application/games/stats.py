@@ -0,0 +1,187 @@
+# Built-in
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
+
+# Third-party
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, Q, Sum, When
+
+# Local
+from games.models import Game, GameScore, HeadToHead, TeamSeasonStats
+from games.standings import FINISHED_GAME_STATUSES, StandingKey, refresh_standings
+
+TeamSeasonKey = Tuple[int, int]
+
+# fields of Game the standings, the stats and the head-to-heads are built from
+STATS_SOURCE_FIELDS = (
+    "datetime",
+    "status",
+    "scores",
+    "league",
+    "season",
+    "home_team",
+    "away_team",
+)
+
+
+def _finished_games(games_filter: Q):
+    return Game.objects.filter(
+        games_filter,
+        status__in=FINISHED_GAME_STATUSES,
+        home_total__isnull=False,
+        away_total__isnull=False,
+    )
+
+
+def _aggregate_matchups(games_filter: Q):
+    """
+    Sums per (season, home team, away team) of the finished games.
+    """
+    return (
+        _finished_games(games_filter)
+        .values("season_id", "home_team_id", "away_team_id")
+        .annotate(
+            games_played=Count("id"),
+            home_wins=Sum(
+                Case(When(home_total__gt=F("away_total"), then=1), default=0)
+            ),
+            away_wins=Sum(
+                Case(When(away_total__gt=F("home_total"), then=1), default=0)
+            ),
+            home_points=Sum("home_total"),
+            away_points=Sum("away_total"),
+            last_played=Max("datetime"),
+        )
+        .order_by()
+    )
+
+
+def _aggregate_periods(games_filter: Q):
+    """
+    Points per (season, team, period) of the finished games.
+    """
+    return (
+        GameScore.objects.filter(game__in=_finished_games(games_filter))
+        .values("season_id", "team_id", "period")
+        .annotate(points=Sum("points"))
+        .order_by()
+    )
+
+
+def _recount(games_filter: Q, keep, batch_size: int):
+    """
+    Store the stats and head-to-heads of the (team, season) pairs `keep` accepts.
+    """
+    stats = {}
+    head_to_heads = {}
+    for row in _aggregate_matchups(games_filter):
+        season_id = row["season_id"]
+        for team_id, opponent_id, wins, losses, points_for, points_against, side in (
+            (
+                row["home_team_id"],
+                row["away_team_id"],
+                row["home_wins"],
+                row["away_wins"],
+                row["home_points"],
+                row["away_points"],
+                "home",
+            ),
+            (
+                row["away_team_id"],
+                row["home_team_id"],
+                row["away_wins"],
+                row["home_wins"],
+                row["away_points"],
+                row["home_points"],
+                "away",
+            ),
+        ):
+            if not keep((team_id, season_id)):
+                continue
+
+            team_stats = stats.setdefault(
+                (team_id, season_id),
+                TeamSeasonStats(team_id=team_id, season_id=season_id),
+            )
+            # a pair may have met both at home and away, the rows add up
+            head_to_head = head_to_heads.setdefault(
+                (team_id, opponent_id, season_id),
+                HeadToHead(
+                    team_id=team_id, opponent_id=opponent_id, season_id=season_id
+                ),
+            )
+            for totals in (team_stats, head_to_head):
+                totals.games_played += row["games_played"]
+                totals.wins += wins
+                totals.losses += losses
+                totals.points_for += points_for
+                totals.points_against += points_against
+            if side == "home":
+                team_stats.home_wins += wins
+                team_stats.home_losses += losses
+            else:
+                team_stats.away_wins += wins
+                team_stats.away_losses += losses
+            if (
+                head_to_head.last_played is None
+                or head_to_head.last_played < row["last_played"]
+            ):
+                head_to_head.last_played = row["last_played"]
+
+    for row in _aggregate_periods(games_filter):
+        team_stats = stats.get((row["team_id"], row["season_id"]))
+        if team_stats is not None:
+            setattr(
+                team_stats,
+                row["period"],
+                getattr(team_stats, row["period"]) + row["points"],
+            )
+
+    TeamSeasonStats.objects.bulk_create(stats.values(), batch_size=batch_size)
+    HeadToHead.objects.bulk_create(head_to_heads.values(), batch_size=batch_size)
+
+
+def refresh_team_stats(keys: Iterable[TeamSeasonKey], batch_size: int = 500):
+    """
+    Recount the stats and head-to-heads of the given (team, season) pairs.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    teams_by_season = defaultdict(set)
+    for team_id, season_id in keys:
+        teams_by_season[season_id].add(team_id)
+    games_filter = Q()
+    stale = Q()
+    for season_id, team_ids in teams_by_season.items():
+        games_filter |= Q(season_id=season_id) & (
+            Q(home_team_id__in=team_ids) | Q(away_team_id__in=team_ids)
+        )
+        stale |= Q(season_id=season_id, team_id__in=team_ids)
+
+    with transaction.atomic():
+        TeamSeasonStats.objects.filter(stale).delete()
+        HeadToHead.objects.filter(stale).delete()
+        _recount(games_filter, keys.__contains__, batch_size)
+
+
+def rebuild_team_stats(season_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """
+    Recount the stats of a season, or of every season, from scratch.
+    """
+    games_filter = Q(season_id=season_id) if season_id else Q()
+    with transaction.atomic():
+        TeamSeasonStats.objects.filter(games_filter).delete()
+        HeadToHead.objects.filter(games_filter).delete()
+        _recount(games_filter, lambda key: True, batch_size)
+    return TeamSeasonStats.objects.filter(games_filter).count()
+
+
+def refresh_game_stats(keys: Iterable[StandingKey]):
+    """
+    Refresh the standings and team stats of the given (league, season, team) keys.
+    """
+    keys = set(keys)
+    refresh_standings(keys)
+    refresh_team_stats({(team_id, season_id) for _, season_id, team_id in keys})
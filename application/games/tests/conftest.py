@@ -1,4 +1,5 @@
 # Built-in
+import copy
 import datetime
 
 # Third-party
@@ -7,6 +8,7 @@ from django.utils.timezone import get_current_timezone, make_aware
 
 # Local
 from games.models import Game, League, Season, Team
+from games.scores import set_score_totals, store_game_scores
 
 
 @pytest.fixture(scope="session")
@@ -52,8 +54,9 @@ def create_team(create_league):
 
 
 @pytest.fixture(scope="session")
-def create_game(create_team):
-    def _create_game():
+def create_teams(create_team):
+    # the home and away teams of the games in examples/games.json
+    def _create_teams():
         home_team = create_team()
         away_team = Team.objects.create(
             country=home_team.country,
@@ -62,8 +65,17 @@ def create_game(create_team):
             reference_id=2,
             name="Miami",
         )
+        return home_team, away_team
+
+    return _create_teams
+
+
+@pytest.fixture(scope="session")
+def create_game(create_teams):
+    def _create_game():
+        home_team, away_team = create_teams()
 
-        game = Game.objects.create(
+        game = Game(
             user=None,
             country=home_team.country,
             season=home_team.season,
@@ -94,6 +106,51 @@ def create_game(create_team):
                 },
             },
         )
+        set_score_totals(game).save()
+        store_game_scores([game], replace=False)
         return game
 
     return _create_game
+
+
+@pytest.fixture(scope="function")
+def create_games_payload(create_data_for_import):
+    def _create_games_payload(size, start=1):
+        template = create_data_for_import(filename="games")["response"][0]
+        payload = []
+        for reference_id in range(start, start + size):
+            game_data = copy.deepcopy(template)
+            game_data["id"] = reference_id
+            payload.append(game_data)
+        return payload
+
+    return _create_games_payload
+
+
+@pytest.fixture(scope="function")
+def create_games(create_game):
+    def _create_games(size):
+        game = create_game()
+        games = [game]
+        for idx in range(1, size):
+            games.append(
+                Game(
+                    user=game.user,
+                    country=game.country,
+                    season=game.season,
+                    league=game.league,
+                    home_team=game.home_team,
+                    away_team=game.away_team,
+                    reference_id=game.reference_id + idx,
+                    datetime=game.datetime - datetime.timedelta(days=idx % 3),
+                    status=game.status,
+                    scores=game.scores,
+                    home_total=game.home_total,
+                    away_total=game.away_total,
+                )
+            )
+        Game.objects.bulk_create(games[1:])
+        store_game_scores(games[1:], replace=False)
+        return list(Game.objects.order_by("id"))
+
+    return _create_games
@@ -1,22 +1,50 @@
-# Third-party
+# Built-in
+import csv
+import datetime
+import gzip
+import io
+import json
 import os
+import threading
 
+# Third-party
 import pytest
 import requests
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
 from rest_framework.reverse import reverse
 
 # Local
-from games.models import Game, League, Season, Team
+from accounts.services import COUNTRY_IDS_INLINE_LIMIT
+from core import renderers
+from core.models import Country
+from core.serializers import CountrySerializer
+from games.calendar import get_game_day_keys, rebuild_game_days, refresh_game_days
+from games.models import (
+    Game,
+    HeadToHead,
+    ImportJob,
+    League,
+    Season,
+    Team,
+    TeamSeasonStats,
+)
 from games.serializers import (
     AdminGameSerializer,
     LeagueSerializer,
     SeasonSerializer,
     TeamSerializer,
+    UserGameSerializer,
 )
+from games.stats import rebuild_team_stats
+from games.views import FastGameListViewSetMixin
 
 
 @pytest.mark.django_db
@@ -237,6 +265,26 @@ def test_league_delete(create_user, create_authenticated_client, create_league):
     assert League.objects.count() == 0
 
 
+@pytest.mark.django_db
+def test_league_list_is_refreshed_on_cascade_delete(
+    create_user,
+    create_authenticated_client,
+    create_league,
+    django_capture_on_commit_callbacks,
+):
+    league = create_league()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("core:leagues-list")
+    assert client.get(url).data["count"] == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        league.country.delete()
+    assert client.get(url).data["count"] == 0
+
+
 @pytest.mark.django_db
 def test_team_list(create_user, create_authenticated_client, create_team):
     team = create_team()
@@ -445,6 +493,40 @@ def test_admin_change_game_user_with_patch(
     assert response.data["user"] == normal_user.id
 
 
+@pytest.mark.django_db
+def test_admin_change_game_team_with_patch(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=3)
+    Game.objects.update(status="Game Finished")
+    rebuild_team_stats()
+    old_team = games[0].home_team
+    new_team = Team.objects.create(
+        country=old_team.country,
+        season=old_team.season,
+        league=old_team.league,
+        reference_id=3,
+        name="Boston",
+    )
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-detail", kwargs={"pk": games[0].id})
+
+    response = client.patch(url, {"home_team": new_team.id}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+
+    # the period rows and the stats of both teams follow the team
+    assert set(
+        games[0].periods.filter(side="home").values_list("team_id", flat=True)
+    ) == {new_team.id}
+    new_stats = TeamSeasonStats.objects.get(team=new_team, season=games[0].season)
+    assert (new_stats.games_played, new_stats.quarter_2) == (1, 25)
+    old_stats = TeamSeasonStats.objects.get(team=old_team, season=games[0].season)
+    assert (old_stats.games_played, old_stats.quarter_2) == (2, 50)
+
+
 @pytest.mark.django_db
 def test_admin_game_delete(create_user, create_authenticated_client, create_game):
     game = create_game()
@@ -459,6 +541,273 @@ def test_admin_game_delete(create_user, create_authenticated_client, create_game
     assert Game.objects.count() == 0
 
 
+@pytest.mark.django_db
+def test_admin_bulk_update_games(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=6)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-bulk")
+
+    data = {
+        "ids": [games[0].id, games[1].id, games[2].id],
+        "data": {"user": normal_user.id, "status": "Postponed"},
+    }
+    with CaptureQueriesContext(connection) as queries:
+        response = client.patch(url, data, format="json")
+    assert response.data == {"success": True, "updated": 3}
+    assert len([q for q in queries if q["sql"].startswith("UPDATE")]) == 1
+    assert Game.objects.filter(user=normal_user, status="Postponed").count() == 3
+
+    data = {
+        "filter": {"user": None, "league": games[0].league_id},
+        "data": {"status": "Cancelled"},
+    }
+    response = client.patch(url, data, format="json")
+    assert response.data == {"success": True, "updated": 3}
+    assert Game.objects.filter(status="Cancelled").count() == 3
+
+    # the typed totals and the period rows follow the scores
+    scores = {
+        "home": {"quarter_1": 30, "total": 30},
+        "away": {"quarter_1": 20, "total": 20},
+    }
+    data = {"ids": [games[3].id], "data": {"scores": scores}}
+    response = client.patch(url, data, format="json")
+    assert response.data == {"success": True, "updated": 1}
+    game = Game.objects.get(pk=games[3].id)
+    assert (game.home_total, game.away_total) == (30, 20)
+    assert sorted(game.periods.values_list("side", "period", "points")) == [
+        ("away", "quarter_1", 20),
+        ("home", "quarter_1", 30),
+    ]
+
+
+@pytest.mark.django_db
+def test_admin_bulk_update_games_refreshes_head_to_head(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=3)
+    Game.objects.update(status="Game Finished")
+    rebuild_team_stats()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+
+    later = games[0].datetime + datetime.timedelta(days=7)
+    response = client.patch(
+        reverse("games:admin-games-bulk"),
+        {"ids": [games[1].id], "data": {"datetime": later.isoformat()}},
+        format="json",
+    )
+    assert response.data == {"success": True, "updated": 1}
+    head_to_head = HeadToHead.objects.get(
+        team=games[0].home_team, opponent=games[0].away_team
+    )
+    assert head_to_head.last_played == later
+
+
+@pytest.mark.django_db
+def test_admin_bulk_update_games_bad_request(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=2)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-bulk")
+
+    # the whole table is never selected by accident
+    response = client.patch(
+        url, {"filter": {}, "data": {"status": "Cancelled"}}, format="json"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.patch(url, {"ids": [games[0].id], "data": {}}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.patch(
+        url, {"ids": [games[0].id], "data": {"user": 999}}, format="json"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not Game.objects.exclude(status=games[0].status).exists()
+
+
+@pytest.mark.django_db
+def test_admin_bulk_delete_games(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=6)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-bulk")
+
+    response = client.delete(url, {"ids": [games[0].id, games[1].id]}, format="json")
+    assert response.data == {"success": True, "deleted": 2}
+    # games[3] is the only one left on the day of games[0]
+    date_from = str(games[0].datetime.date())
+    response = client.delete(url, {"filter": {"date_from": date_from}}, format="json")
+    assert response.data == {"success": True, "deleted": 1}
+    assert set(Game.objects.values_list("id", flat=True)) == {
+        games[2].id,
+        games[4].id,
+        games[5].id,
+    }
+
+
+@pytest.mark.django_db
+def test_admin_export_games(create_user, create_authenticated_client, create_games):
+    games = create_games(size=4)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-export")
+
+    date_from = str(games[0].datetime.date())
+    response = client.get(url, {"file_format": "csv", "date_from": date_from})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response["Content-Disposition"] == 'attachment; filename="games.csv.gz"'
+    rows = list(
+        csv.DictReader(
+            io.StringIO(gzip.decompress(b"".join(response.streaming_content)).decode())
+        )
+    )
+    # the default ordering of the list, newest first
+    assert [int(row["id"]) for row in rows] == [games[3].id, games[0].id]
+    assert rows[0]["league"] == games[0].league.name
+
+    response = client.get(url, {"file_format": "xlsx"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    response = create_authenticated_client(normal_user).get(url)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_admin_game_list_ndjson(create_user, create_authenticated_client, create_games):
+    games = create_games(size=5)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-list")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            url, {"ordering": "id"}, HTTP_ACCEPT="application/x-ndjson"
+        )
+        content = b"".join(response.streaming_content)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    # the user of the token and the games, no count and no page
+    assert len(queries) == 2
+    lines = content.decode().splitlines()
+    assert len(lines) == 5
+    # the same games as the serializer gives, rendered to JSON
+    expected = json.loads(
+        JSONRenderer().render(AdminGameSerializer(games, many=True).data)
+    )
+    assert [json.loads(line) for line in lines] == expected
+    response = client.get(url, {"ordering": "id", "format": "ndjson"})
+    assert b"".join(response.streaming_content) == content
+
+    response = client.get(
+        url, {"team": games[0].home_team_id + 1000}, HTTP_ACCEPT="application/x-ndjson"
+    )
+    assert b"".join(response.streaming_content) == b""
+
+    response = client.get(url, {"ordering": "x"}, HTTP_ACCEPT="application/x-ndjson")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.content.endswith(b"\n")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "url_name",
+    [
+        "games:admin-games-list",
+        "games:user-assigned-games-list",
+        "games:user-unassigned-games-list",
+    ],
+)
+@pytest.mark.parametrize(
+    "query",
+    [
+        {},
+        {"limit": 2, "offset": 1, "ordering": "-datetime"},
+        {"cursor": "", "limit": 2, "ordering": "datetime"},
+        {"status": "Finished", "date_from": "2000-01-01"},
+    ],
+)
+def test_game_list_fast_path_parity(
+    monkeypatch,
+    url_name,
+    query,
+    create_user,
+    create_authenticated_client,
+    create_games,
+):
+    games = create_games(size=5)
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    normal_user.countries.add(games[0].country)
+    Game.objects.filter(pk__in=[games[0].pk, games[1].pk]).update(user=normal_user)
+    Game.objects.filter(pk=games[2].pk).update(status="Amânat\u2028")
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(
+        admin_user if url_name == "games:admin-games-list" else normal_user
+    )
+    url = reverse(url_name)
+
+    fast = client.get(url, query)
+    # the serializer and the renderer of DRF
+    monkeypatch.setattr(FastGameListViewSetMixin, "fast_list", False)
+    monkeypatch.setattr(renderers, "orjson", None)
+    slow = client.get(url, query)
+
+    assert fast.status_code == status.HTTP_200_OK
+    assert fast.data["results"]
+    assert fast.data == slow.data
+    assert fast.content == slow.content
+
+
+@pytest.mark.django_db
+def test_only_game_lists_use_the_fast_renderer(
+    create_user, create_authenticated_client, create_game
+):
+    game = create_game()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+
+    response = client.get(reverse("games:admin-games-list"))
+    assert type(response.accepted_renderer) is renderers.FastJSONRenderer
+    response = client.get(reverse("games:admin-games-detail", kwargs={"pk": game.id}))
+    assert type(response.accepted_renderer) is JSONRenderer
+    response = client.get(
+        reverse("games:admin-games-detail", kwargs={"pk": game.id}),
+        HTTP_ACCEPT="application/x-ndjson",
+    )
+    assert response.status_code == status.HTTP_406_NOT_ACCEPTABLE
+
+
 @pytest.mark.django_db
 def test_normal_user_assigned_game_list(
     create_user, create_authenticated_client, create_game
@@ -596,6 +945,558 @@ def test_normal_user_unassigned_game_is_assigning_to_itself_bad_request(
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
+@pytest.mark.django_db
+def test_normal_user_assigning_a_taken_game_conflict(
+    create_user, create_authenticated_client, create_game
+):
+    game = create_game()
+    url = reverse("games:user-unassigned-games-assign-game", kwargs={"pk": game.id})
+    first_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="first@example.com"
+    )
+    second_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="second@example.com"
+    )
+    first_user.countries.add(game.country)
+    second_user.countries.add(game.country)
+
+    response = create_authenticated_client(first_user).post(url)
+    assert response.status_code == status.HTTP_200_OK
+    response = create_authenticated_client(second_user).post(url)
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.data["success"] is False
+
+    game.refresh_from_db()
+    assert game.user == first_user
+
+
+@pytest.mark.django_db
+def test_normal_user_assigns_games_in_bulk(
+    create_user, create_authenticated_client, create_games, monkeypatch
+):
+    games = create_games(size=6)
+    refreshed_keys = []
+
+    def recording_refresh_game_days(keys):
+        refreshed_keys.append(set(keys))
+        refresh_game_days(keys)
+
+    monkeypatch.setattr("games.services.refresh_game_days", recording_refresh_game_days)
+    url = reverse("games:user-unassigned-games-assign-games")
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    normal_user.countries.add(games[0].country)
+    client = create_authenticated_client(normal_user)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, {"limit": 2}, format="json")
+    assert response.data == {"success": True, "assigned": 2}
+    assert len([q for q in queries if q["sql"].startswith("UPDATE")]) == 1
+    assert list(Game.objects.filter(user=normal_user).values_list("id", flat=True)) == [
+        games[0].id,
+        games[1].id,
+    ]
+
+    ids = [games[0].id, games[4].id, games[5].id]
+    response = client.post(url, {"ids": ids}, format="json")
+    assert response.data == {"success": True, "assigned": 2}
+    assert Game.objects.filter(user__isnull=True).count() == 2
+    # only the days of the games claimed by each request
+    assert refreshed_keys == [
+        get_game_day_keys(Game.objects.filter(pk__in=[games[0].id, games[1].id])),
+        get_game_day_keys(Game.objects.filter(pk__in=[games[4].id, games[5].id])),
+    ]
+
+    response = client.post(url, {"limit": 0}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def _race(workers, target):
+    """
+    Start `workers` threads at the same moment and collect what each returns.
+    """
+    barrier = threading.Barrier(len(workers))
+    results = [None] * len(workers)
+
+    def run(idx, worker):
+        try:
+            barrier.wait()
+            results[idx] = target(worker)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=run, args=(idx, worker))
+        for idx, worker in enumerate(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.django_db(transaction=True)
+def test_normal_users_race_for_games(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=20)
+    users = []
+    clients = []
+    for idx in range(8):
+        user = create_user(
+            user_type=get_user_model().UserTypes.NORMAL, email=f"user{idx}@example.com"
+        )
+        user.countries.add(games[0].country)
+        users.append(user)
+        clients.append(create_authenticated_client(user))
+
+    url = reverse("games:user-unassigned-games-assign-game", kwargs={"pk": games[0].id})
+    statuses = _race(clients, lambda client: client.post(url).status_code)
+    assert statuses.count(status.HTTP_200_OK) == 1
+    assert statuses.count(status.HTTP_409_CONFLICT) == 7
+
+    url = reverse("games:user-unassigned-games-assign-games")
+    assigned = _race(
+        clients,
+        lambda client: client.post(url, {"limit": 5}, format="json").data["assigned"],
+    )
+    # every game went to exactly one user and each request reports its games
+    assert sum(assigned) == 19
+    assert not Game.objects.filter(user__isnull=True).exists()
+    assert assigned == [
+        Game.objects.exclude(pk=games[0].id).filter(user=user).count() for user in users
+    ]
+
+
+@pytest.mark.django_db
+def test_normal_user_calendar(
+    create_user, create_authenticated_client, create_games, django_assert_num_queries
+):
+    games = create_games(size=6)
+    rebuild_game_days()
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    normal_user.countries.add(games[0].country)
+    client = create_authenticated_client(normal_user)
+    url = reverse("games:user-calendar")
+    today = timezone.localdate()
+    params = {"date_from": today - datetime.timedelta(days=2), "days": 3}
+
+    response = client.get(url, {**params, "scope": "unassigned"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["date_to"] == str(today)
+    assert [day["date"] for day in response.data["days"]] == [
+        str(today - datetime.timedelta(days=offset)) for offset in (2, 1, 0)
+    ]
+    assert sorted(
+        game["id"] for day in response.data["days"] for game in day["games"]
+    ) == [game.id for game in games]
+    assert client.get(url, params).data["days"] == []
+
+    # claiming a game moves it to the user's calendar right away
+    assign_url = reverse(
+        "games:user-unassigned-games-assign-game", kwargs={"pk": games[0].id}
+    )
+    assert client.post(assign_url).status_code == status.HTTP_200_OK
+    # the user and a single read of the day buckets
+    with django_assert_num_queries(2):
+        response = client.get(url, params)
+    assert response.data["days"] == [
+        {
+            "date": str(today),
+            "games": [
+                {
+                    "id": games[0].id,
+                    "datetime": UserGameSerializer(games[0]).data["datetime"],
+                    "status": games[0].status,
+                    "league": games[0].league_id,
+                    "home_team": games[0].home_team_id,
+                    "away_team": games[0].away_team_id,
+                    "user": normal_user.id,
+                }
+            ],
+        }
+    ]
+    response = client.get(url, {**params, "scope": "unassigned"})
+    assert sum(len(day["games"]) for day in response.data["days"]) == 5
+
+    response = client.get(url, {"days": 32})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_standings(
+    create_user, create_authenticated_client, create_games, django_assert_num_queries
+):
+    games = create_games(size=3)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    admin_client = create_authenticated_client(admin_user)
+    url = reverse("games:standings")
+    params = {"league": games[0].league_id, "season": games[0].season_id}
+
+    # finishing games through the admin endpoints updates the standings
+    response = admin_client.patch(
+        reverse("games:admin-games-bulk"),
+        {"ids": [games[0].id, games[1].id], "data": {"status": "Game Finished"}},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    scores = {**games[2].scores, "home": {**games[2].scores["home"], "total": 30}}
+    response = admin_client.patch(
+        reverse("games:admin-games-detail", kwargs={"pk": games[2].id}),
+        {"status": "After Over Time", "scores": scores},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    client = create_authenticated_client(normal_user)
+    # the user and a single read of the standings
+    with django_assert_num_queries(2):
+        response = client.get(url, params)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["league"] == games[0].league_id
+    home_team, away_team = response.data["results"]
+    assert home_team == {
+        "team": games[0].home_team_id,
+        "team_name": games[0].home_team.name,
+        "games_played": 3,
+        "wins": 2,
+        "losses": 1,
+        "win_percentage": 0.667,
+        "points_for": 132,
+        "points_against": 105,
+        "differential": 27,
+        "home_wins": 2,
+        "home_losses": 1,
+        "away_wins": 0,
+        "away_losses": 0,
+    }
+    assert (away_team["team"], away_team["wins"], away_team["away_wins"]) == (
+        games[0].away_team_id,
+        1,
+        1,
+    )
+
+    response = admin_client.delete(
+        reverse("games:admin-games-detail", kwargs={"pk": games[2].id})
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = client.get(url, params)
+    assert [team["losses"] for team in response.data["results"]] == [0, 2]
+
+    response = client.get(url, {"league": games[0].league_id})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_team_stats_and_head_to_head(
+    create_user, create_authenticated_client, create_games, django_assert_num_queries
+):
+    games = create_games(size=3)
+    Game.objects.update(status="Game Finished")
+    rebuild_team_stats()
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    client = create_authenticated_client(normal_user)
+    home_team, away_team = games[0].home_team, games[0].away_team
+
+    # the user and a single read of the stats
+    with django_assert_num_queries(2):
+        response = client.get(reverse("games:team-stats"), {"team": home_team.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["team"] == home_team.id
+    (stats,) = response.data["results"]
+    assert (stats["season"], stats["games_played"], stats["home_wins"]) == (
+        games[0].season_id,
+        3,
+        3,
+    )
+    # 51-35 in every game, 25 and 26 points in the second and fourth quarters
+    assert stats["averages"] == {
+        "points_for": 51.0,
+        "points_against": 35.0,
+        "quarter_1": 0.0,
+        "quarter_2": 25.0,
+        "quarter_3": 0.0,
+        "quarter_4": 26.0,
+        "over_time": 0.0,
+    }
+
+    url = reverse("games:head-to-head")
+    with django_assert_num_queries(2):
+        response = client.get(url, {"team": away_team.id, "opponent": home_team.id})
+    assert response.status_code == status.HTTP_200_OK
+    assert {
+        key: response.data[key]
+        for key in ("games_played", "wins", "losses", "points_for", "points_against")
+    } == {
+        "games_played": 3,
+        "wins": 0,
+        "losses": 3,
+        "points_for": 105,
+        "points_against": 153,
+    }
+    assert response.data["last_played"] == UserGameSerializer(games[0]).data["datetime"]
+    assert len(response.data["seasons"]) == 1
+
+    response = client.get(url, {"team": away_team.id})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_admin_game_list_keyset_pagination(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=5)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = f'{reverse("games:admin-games-list")}?cursor=&limit=2'
+
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert "count" not in response.data
+        ids.extend(game["id"] for game in response.data["results"])
+        url = response.data["next"]
+
+    assert ids == [game.id for game in reversed(games)]
+
+
+@pytest.mark.django_db
+def test_admin_game_list_keyset_pagination_by_datetime(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=7)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = f'{reverse("games:admin-games-list")}?cursor=&limit=3&ordering=datetime'
+
+    ids = []
+    while url:
+        response = client.get(url)
+        ids.extend(game["id"] for game in response.data["results"])
+        url = response.data["next"]
+
+    assert ids == [game.id for game in sorted(games, key=lambda g: (g.datetime, g.id))]
+
+
+@pytest.mark.django_db
+def test_keyset_page_does_not_count_or_offset(
+    create_user, create_authenticated_client, create_games
+):
+    create_games(size=10)
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    normal_user.countries.add(Game.objects.first().country)
+    client = create_authenticated_client(normal_user)
+    url = f'{reverse("games:user-unassigned-games-list")}?cursor=&limit=3'
+    response = client.get(url)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(response.data["next"])
+
+    game_queries = [
+        query["sql"]
+        for query in context.captured_queries
+        if 'FROM "games_game"' in query["sql"]
+    ]
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == 3
+    assert len(game_queries) == 1
+    assert "COUNT(" not in game_queries[0]
+    assert "OFFSET" not in game_queries[0]
+
+
+@pytest.mark.django_db
+def test_keyset_pagination_invalid_cursor(
+    create_user, create_authenticated_client, create_game
+):
+    create_game()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = f'{reverse("games:admin-games-list")}?cursor=invalid'
+    response = client.get(url)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_admin_game_list_expanded(
+    create_user, create_authenticated_client, create_games, django_assert_num_queries
+):
+    create_games(size=5)
+    game = Game.objects.order_by("-id").first()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = f'{reverse("games:admin-games-list")}?expand=teams,league,country,season'
+
+    # user lookup, count and the page itself
+    with django_assert_num_queries(3):
+        response = client.get(url)
+
+    result = response.data["results"][0]
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["results"]) == 5
+    assert result["home_team"] == TeamSerializer(game.home_team).data
+    assert result["away_team"] == TeamSerializer(game.away_team).data
+    assert result["league"] == LeagueSerializer(game.league).data
+    assert result["country"] == CountrySerializer(game.country).data
+    assert result["season"] == SeasonSerializer(game.season).data
+
+
+@pytest.mark.django_db
+def test_normal_user_unassigned_game_list_expanded(
+    create_user, create_authenticated_client, create_games, django_assert_num_queries
+):
+    games = create_games(size=5)
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    normal_user.countries.add(games[0].country)
+    client = create_authenticated_client(normal_user)
+    url = f'{reverse("games:user-unassigned-games-list")}?expand=teams&cursor='
+
+    # user lookup, the user's country ids and the page itself
+    with django_assert_num_queries(3):
+        client.get(url)
+    # the country ids are cached from now on
+    with django_assert_num_queries(2) as queries:
+        response = client.get(url)
+
+    assert "accounts_customuser_countries" not in queries.captured_queries[-1]["sql"]
+    result = response.data["results"][0]
+    assert response.status_code == status.HTTP_200_OK
+    assert result["home_team"]["name"] == games[-1].home_team.name
+    assert result["league"] == games[-1].league_id
+
+
+@pytest.mark.django_db
+def test_normal_user_with_many_countries_lists_games_through_the_subquery(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=3)
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    countries = Country.objects.bulk_create(
+        [
+            Country(reference_id=idx, name=str(idx))
+            for idx in range(2, COUNTRY_IDS_INLINE_LIMIT + 2)
+        ]
+    )
+    normal_user.countries.add(games[0].country, *countries)
+    client = create_authenticated_client(normal_user)
+    url = reverse("games:user-unassigned-games-list")
+
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+
+    assert response.data["count"] == 3
+    assert "accounts_customuser_countries" in queries.captured_queries[-1]["sql"]
+
+
+@pytest.mark.django_db
+def test_normal_user_game_lists_follow_country_changes(
+    create_user, create_authenticated_client, create_games, create_country
+):
+    games = create_games(size=3)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    normal_user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    client = create_authenticated_client(normal_user)
+    url = reverse("games:user-unassigned-games-list")
+    assert client.get(url).data["count"] == 0
+
+    normal_user.countries.add(games[0].country)
+    assert client.get(url).data["count"] == 3
+
+    # through the admin endpoint, which sends user_after_save
+    admin_client = create_authenticated_client(admin_user)
+    response = admin_client.patch(
+        reverse("accounts:users-detail", kwargs={"pk": normal_user.id}),
+        {"countries": [create_country().id]},
+        format="json",
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get(url).data["count"] == 0
+
+    # from the country side of the relation
+    games[0].country.customuser_set.add(normal_user)
+    assert client.get(url).data["count"] == 3
+    games[0].country.customuser_set.clear()
+    assert client.get(url).data["count"] == 0
+
+
+@pytest.mark.django_db
+def test_admin_game_list_filters(
+    create_user, create_authenticated_client, create_games
+):
+    games = create_games(size=6)
+    games[1].status = "Postponed"
+    games[1].save()
+    other_team = Team.objects.create(
+        country=games[0].country,
+        season=games[0].season,
+        league=games[0].league,
+        reference_id=3,
+        name="Boston",
+    )
+    Game.objects.filter(pk=games[2].pk).update(away_team=other_team)
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    url = reverse("games:admin-games-list")
+
+    def ids(params):
+        response = client.get(url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return [game["id"] for game in response.data["results"]]
+
+    assert ids({"status": "Postponed"}) == [games[1].id]
+    assert ids({"team": other_team.id}) == [games[2].id]
+    assert len(ids({"league": games[0].league_id, "season": games[0].season_id})) == 6
+    day = games[0].datetime.date()
+    assert ids({"date_from": day, "date_to": day}) == [games[3].id, games[0].id]
+    assert ids({"date_to": day - datetime.timedelta(days=2)}) == [
+        games[5].id,
+        games[2].id,
+    ]
+    # the ordering applies to limit/offset pages as well as to keyset pages
+    assert ids({"ordering": "datetime", "limit": 2}) == [games[2].id, games[5].id]
+    assert ids({"ordering": "datetime", "limit": 2, "cursor": ""}) == [
+        games[2].id,
+        games[5].id,
+    ]
+
+    response = client.get(url, {"ordering": "scores", "date_from": "yesterday"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert set(response.data) == {"ordering", "date_from"}
+
+
 class MockedResponse:
     def __init__(self, status_code_number, text_body):
         self.status_code = status_code_number
@@ -615,16 +1516,9 @@ def mock_get(*args, **kwargs):
 
 @pytest.mark.django_db
 def test_import_games(
-    monkeypatch, create_user, create_authenticated_client, create_team
+    monkeypatch, create_user, create_authenticated_client, create_teams
 ):
-    home_team = create_team()
-    Team.objects.create(
-        country=home_team.country,
-        season=home_team.season,
-        league=home_team.league,
-        reference_id=2,
-        name="Miami",
-    )
+    create_teams()
 
     url = reverse("games:import-games")
     admin_user = create_user(
@@ -632,18 +1526,64 @@ def test_import_games(
     )
     client = create_authenticated_client(admin_user)
 
-    monkeypatch.setattr(requests, "get", mock_get)
+    monkeypatch.setattr(requests.Session, "get", mock_get)
 
     data = dict()
     data["season"] = 2022
     data["league"] = 178
     response = client.post(url, data, format="json")
 
-    assert response.status_code == status.HTTP_201_CREATED
+    assert response.status_code == status.HTTP_202_ACCEPTED
     assert response.data["success"] is True
+    assert Game.objects.count() == 0
+
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
+    job = ImportJob.objects.get(pk=response.data["job"])
+    assert job.status == ImportJob.Statuses.FINISHED
+    assert job.params == {"league": 178, "season": "2022"}
+    assert job.rows_inserted == 1
     assert Game.objects.count() == 1
 
 
+@pytest.mark.django_db
+def test_import_games_upsert(
+    monkeypatch, create_user, create_authenticated_client, create_game
+):
+    game = create_game()
+    game.reference_id = 186156
+    game.save()
+
+    url = reverse("games:import-games")
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+
+    params = dict()
+
+    def mock_get_with_params(*args, **kwargs):
+        params.update(kwargs["params"])
+        return mock_get(*args, **kwargs)
+
+    monkeypatch.setattr(requests.Session, "get", mock_get_with_params)
+
+    data = dict()
+    data["season"] = 2022
+    data["league"] = 178
+    data["upsert"] = True
+    response = client.post(url, data, format="json")
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
+
+    game.refresh_from_db()
+    job = ImportJob.objects.get(pk=response.data["job"])
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert job.rows_updated == 1
+    assert "upsert" not in params
+    assert Game.objects.count() == 1
+    assert game.status == "Game Finished"
+    assert game.scores["home"]["total"] == 46
+
+
 def mock_get_no_results(*args, **kwargs):
     return MockedResponse(status.HTTP_200_OK, '{"results": []}')
 
@@ -657,15 +1597,18 @@ def test_import_games_api_no_results_bad_request(
         user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
     )
     client = create_authenticated_client(admin_user)
-    monkeypatch.setattr(requests, "get", mock_get_no_results)
+    monkeypatch.setattr(requests.Session, "get", mock_get_no_results)
 
     data = dict()
     data["season"] = 2022
     data["league"] = 178
     response = client.post(url, data, format="json")
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
 
-    assert response.status_code == status.HTTP_204_NO_CONTENT
-    assert response.data["success"] is False
+    job = ImportJob.objects.get(pk=response.data["job"])
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert job.status == ImportJob.Statuses.FINISHED
+    assert job.message == "No results matched."
     assert Game.objects.count() == 0
 
 
@@ -682,15 +1625,18 @@ def test_import_games_api_bad_request(
         user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
     )
     client = create_authenticated_client(admin_user)
-    monkeypatch.setattr(requests, "get", mock_get_with_bad_request)
+    monkeypatch.setattr(requests.Session, "get", mock_get_with_bad_request)
 
     data = dict()
     data["season"] = 2022
     data["league"] = 178
     response = client.post(url, data, format="json")
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
 
-    assert response.status_code == status.HTTP_400_BAD_REQUEST
-    assert response.data["success"] is False
+    job = ImportJob.objects.get(pk=response.data["job"])
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert job.status == ImportJob.Statuses.FAILED
+    assert job.message == "Errors message"
     assert Game.objects.count() == 0
 
 
@@ -709,18 +1655,119 @@ def test_import_games_api_service_unavailable(
         user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
     )
     client = create_authenticated_client(admin_user)
-    monkeypatch.setattr(requests, "get", mock_get_service_unavailable)
+    monkeypatch.setattr(requests.Session, "get", mock_get_service_unavailable)
 
     data = dict()
     data["season"] = 2022
     data["league"] = 178
     response = client.post(url, data, format="json")
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
 
-    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
-    assert response.data["success"] is False
+    job = ImportJob.objects.get(pk=response.data["job"])
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert job.status == ImportJob.Statuses.FAILED
+    assert job.message == "Service unavailable."
     assert Game.objects.count() == 0
 
 
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "upstream_response",
+    [
+        MockedResponse(status.HTTP_200_OK, "<html>Bad gateway</html>"),
+        MockedResponse(status.HTTP_200_OK, '{"response": []}'),
+        MockedResponse(status.HTTP_200_OK, '{"results": 1, "response": {}}'),
+        MockedResponse(status.HTTP_400_BAD_REQUEST, '{"message": "Bad request"}'),
+    ],
+)
+def test_import_games_api_invalid_response(
+    monkeypatch, upstream_response, create_user, create_authenticated_client
+):
+    url = reverse("games:import-games")
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    monkeypatch.setattr(
+        requests.Session, "get", lambda *args, **kwargs: upstream_response
+    )
+
+    response = client.post(url, {"season": 2022, "league": 178}, format="json")
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
+
+    job = ImportJob.objects.get(pk=response.data["job"])
+    assert job.status == ImportJob.Statuses.FAILED
+    assert job.message.startswith("Invalid upstream response")
+    assert job.finished_at is not None
+
+
+@pytest.mark.django_db
+def test_import_worker_requeues_stale_jobs(
+    monkeypatch, create_user, create_authenticated_client
+):
+    url = reverse("games:import-games")
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    monkeypatch.setattr(requests.Session, "get", mock_get_service_unavailable)
+    stale = ImportJob.objects.get(
+        pk=client.post(url, {"season": 2022, "league": 178}, format="json").data["job"]
+    )
+    alive = ImportJob.objects.get(
+        pk=client.post(url, {"season": 2022, "league": 12}, format="json").data["job"]
+    )
+    # left running by workers that stopped 20 and 1 minutes ago
+    now = timezone.now()
+    ImportJob.objects.filter(pk=stale.pk).update(
+        status=ImportJob.Statuses.RUNNING,
+        heartbeat_at=now - datetime.timedelta(minutes=20),
+    )
+    ImportJob.objects.filter(pk=alive.pk).update(
+        status=ImportJob.Statuses.RUNNING,
+        heartbeat_at=now - datetime.timedelta(minutes=1),
+    )
+
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
+
+    stale.refresh_from_db()
+    alive.refresh_from_db()
+    assert stale.status == ImportJob.Statuses.FAILED
+    assert stale.message == "Service unavailable."
+    assert alive.status == ImportJob.Statuses.RUNNING
+
+
+@pytest.mark.django_db
+def test_import_job_status(
+    monkeypatch, create_user, create_authenticated_client, create_teams
+):
+    create_teams()
+    admin_user = create_user(
+        user_type=get_user_model().UserTypes.ADMIN, email="admin@example.com"
+    )
+    client = create_authenticated_client(admin_user)
+    monkeypatch.setattr(requests.Session, "get", mock_get)
+
+    data = dict()
+    data["season"] = 2022
+    data["league"] = 178
+    job_id = client.post(reverse("games:import-games"), data, format="json").data["job"]
+    url = reverse("games:import-jobs-detail", kwargs={"pk": job_id})
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["status"] == ImportJob.Statuses.PENDING
+    assert response.data["progress"] == 0.0
+
+    call_command("run_import_worker", once=True, stdout=io.StringIO())
+    response = client.get(url)
+    assert response.data["status"] == ImportJob.Statuses.FINISHED
+    assert response.data["progress"] == 1.0
+    assert response.data["rows_received"] == 1
+    assert response.data["rows_inserted"] == 1
+    assert response.data["rows_skipped"] == 0
+
+
 @pytest.mark.django_db
 def test_import_games_bad_season_data(create_user, create_authenticated_client):
     url = reverse("games:import-games")
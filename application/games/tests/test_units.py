@@ -1,26 +1,60 @@
 # Built-in
+import csv
+import datetime
+import gzip
+import io
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from itertools import zip_longest
+from urllib.parse import parse_qsl, urlsplit
 
 # Third-party
 import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 
+from core.models import Country, ImportCheckpoint
 from core.services import import_countries
 
 # Local
-from games.models import Game, League, Season, Team
-from games.services import import_games, import_leagues, import_seasons, import_teams
+from games import exports
+from games.calendar import get_game_day, refresh_game_days
+from games.filters import filter_games
+from games.management.commands.import_games_bulk import _fetch_in_window
+from games.models import (
+    Game,
+    GameDay,
+    GameScore,
+    HeadToHead,
+    League,
+    Season,
+    Standing,
+    Team,
+    TeamSeasonStats,
+)
+from games.pagination import GamePagination
+from games.readers import EnvelopeReader, JSONStream, NDJSONReader, iter_envelope
+from games.services import (
+    get_changed_game_keys,
+    get_game_keys,
+    import_games,
+    import_leagues,
+    import_seasons,
+    import_teams,
+    sync_games,
+)
+from games.standings import rebuild_standings
+from games.stats import rebuild_team_stats
 
 
 @pytest.mark.django_db
-def test_import_games_service(create_data_for_import, create_team):
-    home_team = create_team()
-    Team.objects.create(
-        country=home_team.country,
-        season=home_team.season,
-        league=home_team.league,
-        reference_id=2,
-        name="Miami",
-    )
+def test_import_games_service(create_data_for_import, create_teams):
+    create_teams()
 
     context = create_data_for_import(filename="games")
     data = context["response"]
@@ -28,6 +62,523 @@ def test_import_games_service(create_data_for_import, create_team):
     assert Game.objects.count() == 1
 
 
+def _count_selects(queries):
+    return sum(1 for query in queries if query["sql"].startswith("SELECT"))
+
+
+@pytest.mark.django_db
+def test_import_games_service_query_count_is_constant_per_chunk(
+    create_games_payload, create_teams
+):
+    create_teams()
+
+    with CaptureQueriesContext(connection) as small_import:
+        import_games(data=create_games_payload(size=1))
+    with CaptureQueriesContext(connection) as large_import:
+        import_games(data=create_games_payload(size=10_000, start=2))
+
+    # the references, the stored games and the games of the calendar days
+    # are read once per chunk: chunked imports trade a few queries per 500
+    # games for short transactions and resumable checkpoints. The games of
+    # the standings and of the team stats (one grouped read per side) are
+    # read once, after the last chunk
+    per_chunk, once = 6, 3
+    assert Game.objects.count() == 10_001
+    assert _count_selects(small_import.captured_queries) == per_chunk + once
+    assert _count_selects(large_import.captured_queries) == (
+        per_chunk * (10_000 // 500) + once
+    )
+
+
+@pytest.mark.django_db
+def test_import_games_service_skips_existing_games(create_games_payload, create_game):
+    game = create_game()
+    data = create_games_payload(size=3, start=game.reference_id)
+    data.append(data[-1])
+
+    assert import_games(data=data) is True
+    assert Game.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_sync_games_upsert_refreshes_changed_games(create_games_payload, create_teams):
+    create_teams()
+    data = create_games_payload(size=3)
+    for game_data in data:
+        game_data["status"]["long"] = "Not Started"
+    sync_games(data=data)
+
+    data[0]["status"]["long"] = "Game Finished"
+    data[0]["scores"]["home"]["total"] = 100
+    data.extend(create_games_payload(size=1, start=4))
+    assert sync_games(data=data) == {"created": 1, "updated": 0, "skipped": 3}
+    assert Game.objects.get(reference_id=1).status == "Not Started"
+
+    assert sync_games(data=data, upsert=True) == {
+        "created": 0,
+        "updated": 1,
+        "skipped": 3,
+    }
+    game = Game.objects.get(reference_id=1)
+    assert game.status == "Game Finished"
+    assert game.scores["home"]["total"] == 100
+    assert Game.objects.filter(status="Not Started").count() == 2
+
+
+@pytest.mark.django_db
+def test_sync_games_upsert_writes_nothing_when_unchanged(
+    create_games_payload, create_teams
+):
+    create_teams()
+    data = create_games_payload(size=50)
+    sync_games(data=data)
+
+    with CaptureQueriesContext(connection) as context:
+        result = sync_games(data=data, upsert=True)
+
+    assert result == {"created": 0, "updated": 0, "skipped": 50}
+    assert _count_selects(context.captured_queries) == len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_sync_games_keeps_calendar_days_in_step(create_games_payload, create_teams):
+    home_team, _ = create_teams()
+    data = create_games_payload(size=3)
+    sync_games(data=data)
+    day = get_game_day(Game.objects.get(reference_id=1).datetime)
+    game_day = GameDay.objects.get()
+    assert (game_day.country_id, game_day.date) == (home_team.country_id, day)
+    assert game_day.games_count == game_day.unassigned_count == 3
+    assert [game["id"] for game in game_day.games] == list(
+        Game.objects.order_by("datetime", "id").values_list("id", flat=True)
+    )
+
+    # a rescheduled game leaves its old day for the new one
+    data[0]["date"] = "2030-01-02T18:00:00+00:00"
+    data[0]["status"]["long"] = "Postponed"
+    sync_games(data=data, upsert=True)
+    assert dict(GameDay.objects.values_list("date", "games_count")) == {
+        day: 2,
+        datetime.date(2030, 1, 2): 1,
+    }
+
+    data[1]["date"] = data[2]["date"] = data[0]["date"]
+    data[1]["status"]["long"] = data[2]["status"]["long"] = "Postponed"
+    sync_games(data=data, upsert=True)
+    assert dict(GameDay.objects.values_list("date", "games_count")) == {
+        datetime.date(2030, 1, 2): 3
+    }
+
+
+@pytest.mark.django_db
+def test_refresh_game_days_reads_only_the_given_days(create_games, monkeypatch):
+    games = create_games(size=6)
+    country_id = games[0].country_id
+    first_day, middle_day, last_day = sorted(
+        {get_game_day(game.datetime) for game in games}
+    )
+    days_read = []
+
+    def recording_get_game_day(value):
+        days_read.append(get_game_day(value))
+        return days_read[-1]
+
+    monkeypatch.setattr("games.calendar.get_game_day", recording_get_game_day)
+    refresh_game_days({(country_id, first_day), (country_id, last_day)})
+
+    assert set(days_read) == {first_day, last_day}
+    assert dict(GameDay.objects.values_list("date", "games_count")) == {
+        first_day: 2,
+        last_day: 2,
+    }
+
+
+@pytest.mark.django_db
+def test_game_keys(create_games):
+    games = create_games(size=3)
+    Game.objects.filter(pk=games[0].pk).update(status="Game Finished")
+    games[0].refresh_from_db()
+
+    keys = get_game_keys(Game.objects.all())
+    assert keys == get_game_keys(games)
+    assert get_game_keys([games[0]]) == {
+        (
+            games[0].country_id,
+            get_game_day(games[0].datetime),
+            games[0].league_id,
+            games[0].season_id,
+            games[0].home_team_id,
+            games[0].away_team_id,
+            True,
+        )
+    }
+    later = games[1].datetime + datetime.timedelta(days=1)
+    changed = get_changed_game_keys(
+        get_game_keys([games[1]]), {"datetime": later, "status": "Game Finished"}
+    )
+    games[1].datetime, games[1].status = later, "Game Finished"
+    assert changed == get_game_keys([games[1]])
+
+
+@pytest.mark.django_db
+def test_rebuild_game_calendar_command(create_games):
+    games = create_games(size=6)
+    GameDay.objects.create(
+        country=games[0].country, date=datetime.date(2000, 1, 1), games_count=1
+    )
+
+    out = io.StringIO()
+    call_command("rebuild_game_calendar", "--batch-size", "2", stdout=out)
+
+    assert "3 days rebuilt" in out.getvalue()
+    assert sorted(GameDay.objects.values_list("date", "games_count")) == sorted(
+        (get_game_day(game.datetime), 2) for game in games[:3]
+    )
+
+
+@pytest.mark.django_db
+def test_sync_games_stores_normalized_scores(create_games_payload, create_teams):
+    create_teams()
+    data = create_games_payload(size=2)
+    sync_games(data=data)
+    game = Game.objects.get(reference_id=1)
+    assert (game.home_total, game.away_total) == (46, 50)
+    # the over time is null in the payload and gets no row
+    assert sorted(game.periods.values_list("side", "period", "points")) == [
+        ("away", "quarter_1", 0),
+        ("away", "quarter_2", 23),
+        ("away", "quarter_3", 0),
+        ("away", "quarter_4", 27),
+        ("home", "quarter_1", 0),
+        ("home", "quarter_2", 25),
+        ("home", "quarter_3", 0),
+        ("home", "quarter_4", 21),
+    ]
+
+    data[0]["scores"]["home"]["over_time"] = 10
+    data[0]["scores"]["home"]["total"] = 56
+    sync_games(data=data, upsert=True)
+    game.refresh_from_db()
+    assert (game.home_total, game.away_total) == (56, 50)
+    assert game.periods.count() == 9
+    assert game.periods.get(side="home", period="over_time").points == 10
+    assert GameScore.objects.count() == 17
+
+
+@pytest.mark.django_db
+def test_backfill_game_scores_command(create_games):
+    games = create_games(size=3)
+    Game.objects.update(status="Game Finished", home_total=None, away_total=None)
+    GameScore.objects.all().delete()
+    Game.objects.filter(pk=games[0].pk).update(scores={})
+    rebuild_standings()
+    rebuild_team_stats()
+    assert not Standing.objects.exists()
+
+    out = io.StringIO()
+    call_command("backfill_game_scores", "--batch-size", "2", stdout=out)
+
+    assert "3 games backfilled" in out.getvalue()
+    assert list(
+        Game.objects.order_by("pk").values_list("home_total", "away_total")
+    ) == [
+        (None, None),
+        (51, 35),
+        (51, 35),
+    ]
+    # 25 and 26 points for the home side, 21 and 14 for the away side
+    assert GameScore.objects.count() == 8
+    assert GameScore.objects.filter(side="home").aggregate(Sum("points")) == {
+        "points__sum": 102
+    }
+    # the games now count in the standings and stats of their teams
+    assert Standing.objects.get(team=games[0].home_team).games_played == 2
+    stats = TeamSeasonStats.objects.get(team=games[0].home_team)
+    assert (stats.games_played, stats.quarter_2) == (2, 50)
+    assert HeadToHead.objects.get(team=games[0].home_team).games_played == 2
+
+    out = io.StringIO()
+    call_command("backfill_game_scores", "--missing", stdout=out)
+    assert "1 games backfilled" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_benchmark_score_aggregates_command(create_games):
+    games = create_games(size=4)
+
+    out = io.StringIO()
+    call_command(
+        "benchmark_score_aggregates",
+        "--season",
+        str(games[0].season.year),
+        "--repeat",
+        "2",
+        stdout=out,
+    )
+    assert "json: 2 teams" in out.getvalue()
+    assert "normalized: 2 teams" in out.getvalue()
+    assert "Done. 4 games, the aggregates agree." in out.getvalue()
+
+    # stale normalized columns are reported
+    Game.objects.filter(pk=games[0].pk).update(home_total=0)
+    with pytest.raises(CommandError):
+        call_command(
+            "benchmark_score_aggregates", "--season", str(games[0].season.year)
+        )
+
+
+@pytest.mark.django_db
+def test_benchmark_game_lists_command(create_games):
+    with pytest.raises(CommandError):
+        call_command("benchmark_game_lists")
+    create_games(size=3)
+
+    out = io.StringIO()
+    call_command("benchmark_game_lists", "--requests", "2", "--limit", "2", stdout=out)
+    assert "drf: " in out.getvalue()
+    assert "fast: " in out.getvalue()
+    assert "Done. The responses are identical." in out.getvalue()
+
+
+def _standing_records():
+    return {
+        standing.team.reference_id: (
+            standing.wins,
+            standing.losses,
+            standing.points_for,
+            standing.points_against,
+            standing.home_wins,
+            standing.away_wins,
+        )
+        for standing in Standing.objects.select_related("team")
+    }
+
+
+@pytest.mark.django_db
+def test_sync_games_keeps_standings_in_step(create_games_payload, create_teams):
+    create_teams()
+    # 46-50 road wins for team 2, the last game is swapped into a home win
+    data = create_games_payload(size=3)
+    for key in ("teams", "scores"):
+        data[2][key]["home"], data[2][key]["away"] = (
+            data[2][key]["away"],
+            data[2][key]["home"],
+        )
+    data[1]["status"]["long"] = "Not Started"
+    sync_games(data=data)
+    assert _standing_records() == {
+        1: (0, 2, 92, 100, 0, 0),
+        2: (2, 0, 100, 92, 1, 1),
+    }
+
+    # a game finishing and a corrected score only recount the teams involved
+    data[1]["status"]["long"] = "After Over Time"
+    data[0]["scores"]["home"]["total"] = 60
+    sync_games(data=data, upsert=True)
+    assert _standing_records() == {
+        1: (1, 2, 152, 150, 1, 0),
+        2: (2, 1, 150, 152, 1, 1),
+    }
+
+    for game_data in data:
+        game_data["status"]["long"] = "Postponed"
+    sync_games(data=data, upsert=True)
+    assert not Standing.objects.exists()
+
+
+@pytest.mark.django_db
+def test_import_games_refreshes_standings_once_at_the_end(
+    create_games_payload, create_teams, monkeypatch
+):
+    create_teams()
+    data = create_games_payload(size=3)
+    calls = []
+
+    def failing_sync_games(data, upsert, stat_keys):
+        calls.append(data[0]["id"])
+        if len(calls) == 3:
+            raise RuntimeError("Connection lost")
+        return sync_games(data=data, upsert=upsert, stat_keys=stat_keys)
+
+    monkeypatch.setattr("games.services.sync_games", failing_sync_games)
+    with pytest.raises(RuntimeError):
+        import_games(data=data, source="games", chunk_size=1)
+    # the keys of the committed chunks wait in the checkpoint
+    checkpoint = ImportCheckpoint.objects.get(source="games")
+    assert not Standing.objects.exists()
+    assert len(checkpoint.pending) == 2
+
+    import_games(data=data, source="games", chunk_size=1)
+    checkpoint.refresh_from_db()
+    assert calls == [1, 2, 3, 3]
+    assert checkpoint.completed is True
+    assert checkpoint.pending == []
+    assert _standing_records() == {
+        1: (0, 3, 138, 150, 0, 0),
+        2: (3, 0, 150, 138, 0, 3),
+    }
+
+
+@pytest.mark.django_db
+def test_rebuild_standings_command(create_games):
+    games = create_games(size=4)
+    Game.objects.filter(pk__in=[games[0].pk, games[1].pk]).update(
+        status="Game Finished"
+    )
+    Standing.objects.create(
+        league=games[0].league, season=games[0].season, team=games[0].home_team
+    )
+
+    out = io.StringIO()
+    call_command("rebuild_standings", "--batch-size", "1", stdout=out)
+
+    assert "2 standings rebuilt" in out.getvalue()
+    # 51-35 home wins in the fixture
+    assert _standing_records() == {
+        games[0].home_team.reference_id: (2, 0, 102, 70, 2, 0),
+        games[0].away_team.reference_id: (0, 2, 70, 102, 0, 0),
+    }
+
+
+def _team_stats():
+    return {
+        (stats.team.reference_id, stats.season_id): (
+            stats.games_played,
+            stats.wins,
+            stats.home_wins,
+            stats.away_wins,
+            stats.points_for,
+            stats.points_against,
+            stats.quarter_2,
+            stats.quarter_4,
+            stats.over_time,
+        )
+        for stats in TeamSeasonStats.objects.select_related("team")
+    }
+
+
+def _head_to_heads():
+    return {
+        (row.team.reference_id, row.opponent.reference_id): (
+            row.games_played,
+            row.wins,
+            row.losses,
+            row.points_for,
+            row.points_against,
+        )
+        for row in HeadToHead.objects.select_related("team", "opponent")
+    }
+
+
+@pytest.mark.django_db
+def test_sync_games_keeps_team_stats_in_step(create_games_payload, create_teams):
+    home_team, _ = create_teams()
+    season_id = home_team.season_id
+    # 46-50 road wins for team 2 (quarters 25 and 21 against 23 and 27)
+    data = create_games_payload(size=3)
+    data[1]["status"]["long"] = "Not Started"
+    sync_games(data=data)
+    assert _team_stats() == {
+        (1, season_id): (2, 0, 0, 0, 92, 100, 50, 42, 0),
+        (2, season_id): (2, 2, 0, 2, 100, 92, 46, 54, 0),
+    }
+    assert _head_to_heads() == {(1, 2): (2, 0, 2, 92, 100), (2, 1): (2, 2, 0, 100, 92)}
+
+    # team 1 wins the third game in over time
+    data[2]["scores"]["home"]["over_time"] = 10
+    data[2]["scores"]["home"]["total"] = 56
+    data[2]["status"]["long"] = "After Over Time"
+    sync_games(data=data, upsert=True)
+    assert _team_stats() == {
+        (1, season_id): (2, 1, 1, 0, 102, 100, 50, 42, 10),
+        (2, season_id): (2, 1, 0, 1, 100, 102, 46, 54, 0),
+    }
+    assert _head_to_heads() == {
+        (1, 2): (2, 1, 1, 102, 100),
+        (2, 1): (2, 1, 1, 100, 102),
+    }
+
+    # the season wide recount agrees with the incremental updates
+    team_stats, head_to_heads = _team_stats(), _head_to_heads()
+    rebuild_team_stats(season_id=season_id)
+    assert (_team_stats(), _head_to_heads()) == (team_stats, head_to_heads)
+
+
+@pytest.mark.django_db
+def test_rebuild_team_stats_command(create_games):
+    games = create_games(size=4)
+    Game.objects.filter(pk__in=[games[0].pk, games[1].pk]).update(
+        status="Game Finished"
+    )
+    HeadToHead.objects.create(
+        team=games[0].away_team,
+        opponent=games[0].home_team,
+        season=games[0].season,
+        games_played=9,
+    )
+
+    out = io.StringIO()
+    call_command(
+        "rebuild_team_stats", "--season", str(games[0].season.year), stdout=out
+    )
+
+    assert "2 team seasons rebuilt" in out.getvalue()
+    home, away = games[0].home_team.reference_id, games[0].away_team.reference_id
+    # 51-35 home wins in the fixture
+    assert _head_to_heads() == {
+        (home, away): (2, 2, 0, 102, 70),
+        (away, home): (2, 0, 2, 70, 102),
+    }
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_team_stats", "--season", "1900")
+
+
+@pytest.mark.django_db
+def test_export_games_command_csv(tmp_path, create_games):
+    games = create_games(size=3)
+    path = tmp_path / "games.csv.gz"
+
+    out = io.StringIO()
+    call_command(
+        "export_games", str(path), "--format", "csv", "--chunk-size", "2", stdout=out
+    )
+
+    assert "3 games exported as csv" in out.getvalue()
+    with gzip.open(path, "rt", newline="") as file:
+        rows = list(csv.DictReader(file))
+    assert [int(row["id"]) for row in rows] == [game.id for game in games]
+    assert rows[0]["league"] == games[0].league.name
+    assert rows[0]["home_team"] == games[0].home_team.name
+    assert rows[0]["away_team"] == games[0].away_team.name
+    assert rows[0]["season"] == str(games[0].season.year)
+    assert (rows[0]["home_total"], rows[0]["away_total"]) == ("51", "35")
+    assert rows[0]["user_id"] == str(games[0].user_id or "")
+
+    with pytest.raises(CommandError):
+        call_command("export_games", str(path), "--season", "1900")
+
+
+@pytest.mark.django_db
+def test_export_games_command_parquet(tmp_path, monkeypatch, create_games):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    games = create_games(size=3)
+    path = tmp_path / "games.parquet"
+
+    call_command("export_games", str(path), "--chunk-size", "2", stdout=io.StringIO())
+
+    table = pyarrow_parquet.read_table(path)
+    assert table.num_rows == 3
+    assert table.column_names == [column for column, _ in exports.EXPORT_COLUMNS]
+    assert table.column("id").to_pylist() == [game.id for game in games]
+    assert table.column("datetime").to_pylist()[0] == games[0].datetime
+    assert set(table.column("home_team").to_pylist()) == {games[0].home_team.name}
+
+    monkeypatch.setattr(exports, "pyarrow", None)
+    with pytest.raises(CommandError):
+        call_command("export_games", str(path), "--format", "parquet")
+
+
 @pytest.mark.django_db
 def test_import_seasons_service(create_data_for_import):
     context = create_data_for_import(filename="seasons")
@@ -57,6 +608,40 @@ def test_import_leagues_service(create_data_for_import):
     assert League.objects.count() == 109
 
 
+@pytest.mark.django_db
+def test_import_leagues_service_query_count_is_constant_per_chunk(
+    create_data_for_import,
+):
+    countries_data = create_data_for_import(filename="countries")
+    import_countries(data=countries_data["response"])
+    seasons_data = create_data_for_import(filename="seasons")
+    years = seasons_data["response"][0::2]
+    periods = seasons_data["response"][1::2]
+    import_seasons(data=dict(zip_longest(years, periods)))
+
+    leagues = create_data_for_import(filename="leagues")["response"]
+    scaled = []
+    for copy_idx in range(1, 51):
+        for league_data in leagues:
+            scaled.append({**league_data, "id": league_data["id"] + copy_idx * 500})
+
+    with CaptureQueriesContext(connection) as small_import:
+        import_leagues(data=leagues)
+    with CaptureQueriesContext(connection) as large_import:
+        import_leagues(data=scaled, chunk_size=1000)
+    with CaptureQueriesContext(connection) as repeated_import:
+        import_leagues(data=scaled, chunk_size=1000)
+
+    chunks = -(-len(scaled) // 1000)
+    assert League.objects.count() == 109 * 51
+    assert _count_selects(small_import.captured_queries) == 3
+    assert _count_selects(large_import.captured_queries) == 3 * chunks
+    assert _count_selects(repeated_import.captured_queries) == 3 * chunks
+    assert not any(
+        query["sql"].startswith("INSERT") for query in repeated_import.captured_queries
+    )
+
+
 @pytest.mark.django_db
 def test_import_teams_service(create_data_for_import):
     # import countries
@@ -78,3 +663,382 @@ def test_import_teams_service(create_data_for_import):
     context = create_data_for_import(filename="teams")
     assert import_teams(data=context["response"], season=2022, league=178) is True
     assert Team.objects.count() == 12
+
+
+@pytest.mark.django_db
+def test_import_teams_service_query_count_is_constant_per_chunk(
+    create_data_for_import,
+):
+    countries_data = create_data_for_import(filename="countries")
+    import_countries(data=countries_data["response"])
+    seasons_data = create_data_for_import(filename="seasons")
+    years = seasons_data["response"][0::2]
+    periods = seasons_data["response"][1::2]
+    import_seasons(data=dict(zip_longest(years, periods)))
+    import_leagues(data=create_data_for_import(filename="leagues")["response"])
+
+    teams = create_data_for_import(filename="teams")["response"]
+    scaled = []
+    for copy_idx in range(50):
+        for team_data in teams:
+            scaled.append({**team_data, "id": team_data["id"] + copy_idx * 10_000})
+
+    with CaptureQueriesContext(connection) as small_import:
+        import_teams(data=teams, season=2022, league=178)
+    with CaptureQueriesContext(connection) as large_import:
+        import_teams(data=scaled, season=2022, league=178, chunk_size=100)
+    with CaptureQueriesContext(connection) as repeated_import:
+        import_teams(data=scaled, season=2022, league=178, chunk_size=100)
+
+    # the countries, the league and the teams already stored
+    chunks = -(-len(scaled) // 100)
+    assert Team.objects.count() == 12 * 50
+    assert _count_selects(small_import.captured_queries) == 3
+    assert _count_selects(large_import.captured_queries) == 3 * chunks
+    assert _count_selects(repeated_import.captured_queries) == 3 * chunks
+    assert not any(
+        query["sql"].startswith("INSERT") for query in repeated_import.captured_queries
+    )
+
+
+@pytest.mark.django_db
+def test_game_list_queries_use_indexes(create_user, create_game):
+    game = create_game()
+    user = create_user(
+        user_type=get_user_model().UserTypes.NORMAL, email="user@example.com"
+    )
+    countries = Country.objects.bulk_create(
+        [Country(reference_id=idx, name=str(idx)) for idx in range(2, 40)]
+    )
+    Game.objects.bulk_create(
+        [
+            Game(
+                user=user if idx % 10 == 0 else None,
+                country=countries[idx % len(countries)],
+                season=game.season,
+                league=game.league,
+                home_team=game.home_team,
+                away_team=game.away_team,
+                reference_id=idx,
+                datetime=game.datetime,
+                status=game.status,
+                scores=game.scores,
+            )
+            for idx in range(2, 5000)
+        ]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    country_ids = [countries[0].id, countries[1].id]
+
+    assigned_plan = (
+        Game.objects.filter(country_id__in=country_ids, user=user)
+        .order_by("-id")
+        .explain()
+    )
+    unassigned_plan = (
+        Game.objects.filter(country_id=country_ids[0], user__isnull=True)
+        .order_by("-id")
+        .explain()
+    )
+    import_plan = Game.objects.filter(reference_id__in=[1, 2]).explain()
+
+    assert "USING INDEX game_country_" in assigned_plan
+    assert "USING INDEX game_country_" in unassigned_plan
+    assert "TEMP B-TREE" not in unassigned_plan
+    assert "SCAN games_game" not in assigned_plan + unassigned_plan + import_plan
+    assert "reference_id" in import_plan
+
+
+@pytest.mark.django_db
+def test_game_list_filters_use_indexes(create_game):
+    game = create_game()
+    seasons = Season.objects.bulk_create(
+        [Season(year=year, period=str(year)) for year in range(2000, 2010)]
+    )
+    leagues = League.objects.bulk_create(
+        [
+            League(
+                country=game.country,
+                season=seasons[idx % len(seasons)],
+                reference_id=idx,
+                name=str(idx),
+                type="League",
+            )
+            for idx in range(100, 130)
+        ]
+    )
+    teams = Team.objects.bulk_create(
+        [
+            Team(
+                country=game.country,
+                season=game.season,
+                league=leagues[idx % len(leagues)],
+                reference_id=idx,
+                name=str(idx),
+            )
+            for idx in range(100, 200)
+        ]
+    )
+    statuses = ["Game Finished", "Not Started", "Postponed", "Cancelled"]
+    Game.objects.bulk_create(
+        [
+            Game(
+                country=game.country,
+                season=seasons[idx % len(seasons)],
+                league=leagues[idx % len(leagues)],
+                home_team=teams[idx % len(teams)],
+                away_team=teams[(idx * 7 + 1) % len(teams)],
+                reference_id=idx,
+                datetime=game.datetime - datetime.timedelta(hours=idx),
+                status=statuses[idx % len(statuses)],
+                scores=game.scores,
+            )
+            for idx in range(2, 20_000)
+        ]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+    day = (game.datetime - datetime.timedelta(days=100)).date()
+    week = {"date_from": day, "date_to": day + datetime.timedelta(days=6)}
+    combinations = [
+        {"league": leagues[0].id},
+        {"season": seasons[0].id},
+        {"team": teams[0].id},
+        {"status": "Postponed"},
+        week,
+        {"league": leagues[0].id, **week},
+        {"season": seasons[0].id, **week},
+        {"team": teams[0].id, **week},
+        {"status": "Postponed", **week},
+        {"league": leagues[0].id, "status": "Postponed", **week},
+    ]
+    for filters in combinations:
+        for ordering in GamePagination.orderings.values():
+            queryset = filter_games(Game.objects.all(), filters).order_by(*ordering)
+            plan = queryset[:100].explain()
+            assert "SEARCH games_game USING" in plan, (filters, ordering, plan)
+            assert "SCAN games_game" not in plan, (filters, ordering, plan)
+            # the date range is part of the index search, not filtered after
+            if "date_from" in filters:
+                assert "datetime>? AND datetime<?" in plan, (filters, plan)
+            # a datetime ordering is read from the index, except for the
+            # union of the home and away team indexes
+            if ordering[0].endswith("datetime") and "team" not in filters:
+                assert "TEMP B-TREE" not in plan, (filters, ordering, plan)
+
+
+def test_iter_envelope_streams_response_items(create_games_payload):
+    data = create_games_payload(size=20)
+    envelope = {
+        "get": "games",
+        "parameters": {"league": "178", "season": "2022"},
+        "errors": [],
+        "results": 20,
+        "response": data,
+        "paging": {"current": 1, "total": 1},
+    }
+    file = io.StringIO(json.dumps(envelope, indent=4))
+
+    assert list(iter_envelope(file, chunk_size=7)) == data
+    assert list(iter_envelope(io.StringIO('{"response": []}'))) == []
+
+
+def test_iter_envelope_invalid_json():
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_envelope(io.StringIO('{"response": [{"id": 1} {"id": 2}]}')))
+
+
+def test_iter_envelope_literals_across_chunks():
+    items = [{"a": True, "b": False, "c": None, "d": -1.5e3, "e": "x" * 40}] * 3
+    text = json.dumps({"response": items})
+    for chunk_size in range(1, 12):
+        assert list(iter_envelope(io.StringIO(text), chunk_size=chunk_size)) == items
+
+
+def test_iter_envelope_invalid_item_fails_without_reading_on():
+    class CountingReader(io.StringIO):
+        read_count = 0
+
+        def read(self, size=-1):
+            self.read_count += 1
+            return super().read(size)
+
+    padding = ", ".join(['{"id": 2}'] * 100_000)
+    file = CountingReader('{"response": [{"id": 1, "x": ]}, ' + padding + "]}")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_envelope(file, chunk_size=64))
+    assert file.read_count < 5
+
+    # an unterminated string is bounded by the size cap
+    stream = JSONStream(
+        io.StringIO('"' + "x" * 10_000), chunk_size=64, max_value_size=1000
+    )
+    with pytest.raises(json.JSONDecodeError, match="larger than"):
+        stream.decode()
+
+
+@pytest.mark.django_db
+def test_import_games_file_command(tmp_path, create_games_payload, create_teams):
+    create_teams()
+    envelope_path = tmp_path / "games.json"
+    envelope_path.write_text(json.dumps({"response": create_games_payload(size=25)}))
+    ndjson_path = tmp_path / "games.ndjson"
+    ndjson_path.write_text(
+        "\n".join(json.dumps(game) for game in create_games_payload(size=50))
+    )
+
+    out = io.StringIO()
+    call_command("import_games_file", str(envelope_path), chunk_size=10, stdout=out)
+    assert Game.objects.count() == 25
+    assert "25 added, 0 updated, 0 skipped" in out.getvalue()
+    assert "rows/s" in out.getvalue()
+
+    out = io.StringIO()
+    call_command("import_games_file", str(ndjson_path), chunk_size=10, stdout=out)
+    assert Game.objects.count() == 50
+    assert "25 added, 0 updated, 25 skipped" in out.getvalue()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "file_format, reader_class",
+    [("ndjson", NDJSONReader), ("envelope", EnvelopeReader)],
+)
+def test_import_games_file_command_resumes(
+    tmp_path,
+    monkeypatch,
+    create_games_payload,
+    create_teams,
+    file_format,
+    reader_class,
+):
+    seek = reader_class.seek
+    create_teams()
+    games = create_games_payload(size=50)
+    for game in games:
+        # multibyte characters, the checkpoint offset counts bytes
+        game["venue"] = "Estádio Nacional"
+    if file_format == "ndjson":
+        path = tmp_path / "games.ndjson"
+        content = "\n".join(json.dumps(game, ensure_ascii=False) for game in games)
+    else:
+        path = tmp_path / "games.json"
+        content = json.dumps({"get": "games", "response": games}, ensure_ascii=False)
+    path.write_text(content, encoding="utf-8")
+    sync_games_calls = []
+    seeks = []
+    monkeypatch.setattr(
+        reader_class,
+        "seek",
+        lambda reader, offset: seeks.append(offset) or seek(reader, offset),
+    )
+
+    def failing_sync_games(data, upsert=False, stat_keys=None):
+        sync_games_calls.append(data[0]["id"])
+        if len(sync_games_calls) == 3:
+            raise RuntimeError("Database gone")
+        return sync_games(data=data, upsert=upsert, stat_keys=stat_keys)
+
+    monkeypatch.setattr(
+        "games.management.commands.import_games_file.sync_games", failing_sync_games
+    )
+    with pytest.raises(RuntimeError):
+        call_command(
+            "import_games_file", str(path), chunk_size=10, stdout=io.StringIO()
+        )
+    assert Game.objects.count() == 20
+
+    out = io.StringIO()
+    call_command("import_games_file", str(path), chunk_size=10, stdout=out)
+    assert sync_games_calls[3:] == [21, 31, 41]
+    assert Game.objects.count() == 50
+    # straight after the 20th game rather than parsing the file up to it
+    assert len(seeks) == 1
+    offset = seeks[0]
+    rest = content.encode()[offset:].lstrip(b", \n")
+    assert rest.startswith(json.dumps(games[20], ensure_ascii=False).encode())
+    assert "30 added, 0 updated, 0 skipped" in out.getvalue()
+
+    # a completed import starts over on the next run
+    out = io.StringIO()
+    call_command("import_games_file", str(path), chunk_size=10, stdout=out)
+    assert "0 added, 0 updated, 50 skipped" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_games_bulk_command(upstream_server, create_games_payload, create_teams):
+    create_teams()
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def reply(handler):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.2)
+        with lock:
+            in_flight["now"] -= 1
+        params = dict(parse_qsl(urlsplit(handler.path).query))
+        reference_id = int(params["league"]) * 10 + int(params["date"][-1])
+        data = create_games_payload(size=1, start=reference_id)
+        return 200, json.dumps({"results": 1, "response": data}), {}
+
+    upstream_server.add("/games", reply)
+    args = [
+        "--leagues",
+        "1",
+        "2",
+        "--seasons=2022",
+        "--date-from=2022-07-01",
+        "--date-to=2022-07-03",
+    ]
+
+    out = io.StringIO()
+    started = time.perf_counter()
+    call_command("import_games_bulk", *args, "--workers=1", stdout=out)
+    serial = time.perf_counter() - started
+    assert Game.objects.count() == 6
+    assert in_flight["max"] == 1
+    assert "6 requests (0 failed), 6 added" in out.getvalue()
+
+    Game.objects.all().delete()
+    out = io.StringIO()
+    started = time.perf_counter()
+    call_command("import_games_bulk", *args, "--workers=6", stdout=out)
+    concurrent = time.perf_counter() - started
+    assert Game.objects.count() == 6
+    assert in_flight["max"] > 1
+    assert concurrent < serial
+
+
+def test_import_games_bulk_command_bounds_the_requests_in_flight(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(
+        "games.management.commands.import_games_bulk.fetch_games",
+        lambda params, offline: submitted.append(params),
+    )
+    requests_params = [{"league": league} for league in range(20)]
+
+    handed_out = []
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for params, _ in _fetch_in_window(
+            executor, requests_params, offline=False, window=4
+        ):
+            handed_out.append(params)
+            assert len(submitted) - len(handed_out) <= 3
+
+    assert sorted(handed_out, key=lambda params: params["league"]) == (requests_params)
+
+
+@pytest.mark.django_db
+def test_import_games_bulk_command_reports_failures(upstream_server):
+    upstream_server.add("/games", (500, "{}"))
+    out, err = io.StringIO(), io.StringIO()
+    call_command(
+        "import_games_bulk", "--leagues=1", "--seasons=2022", stdout=out, stderr=err
+    )
+
+    assert "Service unavailable." in err.getvalue()
+    assert "1 requests (1 failed)" in out.getvalue()
@@ -11,6 +11,9 @@ app_name = "games"
 router_admin = routers.DefaultRouter()
 router_admin.register("", views.AdminGameViewSet, basename="admin-games")
 
+router_jobs = routers.DefaultRouter()
+router_jobs.register("", views.ImportJobViewSet, basename="import-jobs")
+
 router_user = routers.DefaultRouter()
 router_user.register(
     "assigned", views.UserAssignedGameViewSet, basename="user-assigned-games"
@@ -21,6 +24,11 @@ router_user.register(
 
 urlpatterns = [
     path("import-games/", views.ImportGameAPIView.as_view(), name="import-games"),
+    path("import-jobs/", include(router_jobs.urls)),
+    path("standings/", views.StandingsAPIView.as_view(), name="standings"),
+    path("team-stats/", views.TeamStatsAPIView.as_view(), name="team-stats"),
+    path("head-to-head/", views.HeadToHeadAPIView.as_view(), name="head-to-head"),
     path("", include(router_admin.urls)),
+    path("user/calendar/", views.UserCalendarAPIView.as_view(), name="user-calendar"),
     path("user/", include(router_user.urls)),
 ]
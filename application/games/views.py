@@ -1,55 +1,143 @@
 # Built-in
-import json
-import os
+import datetime
 
 # Third-party
-import requests
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, FloatField, ProtectedError
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
 # Local
+from accounts.services import get_user_countries_lookup, get_user_country_ids
 from core.permissions import AdminsOnlyPermission, UsersOnlyPermission
-from games.models import Game, League, Season, Team
+from core.renderers import FastJSONRenderer, NDJSONRenderer
+from core.serializers import RowMapper
+from core.views import CachedReferenceViewSetMixin
+from games.exports import EXPORT_FORMATS, iter_game_export, iter_game_ndjson
+from games.filters import GameFilterBackend, filter_games
+from games.jobs import enqueue_import_job
+from games.models import (
+    Game,
+    GameDay,
+    HeadToHead,
+    ImportJob,
+    League,
+    Season,
+    Standing,
+    Team,
+    TeamSeasonStats,
+)
+from games.pagination import GamePagination
+from games.scores import SCORE_SOURCE_FIELDS, get_score_totals
 from games.serializers import (
     AdminGameSerializer,
+    AssignGamesSerializer,
+    BulkGameChangesSerializer,
+    BulkGameSelectionSerializer,
+    GameCalendarSerializer,
+    GameExportSerializer,
+    HeadToHeadFilterSerializer,
+    HeadToHeadSerializer,
     ImportGameSerializer,
+    ImportJobSerializer,
     LeagueSerializer,
     SeasonSerializer,
+    StandingFilterSerializer,
+    StandingSerializer,
+    TeamSeasonStatsSerializer,
     TeamSerializer,
+    TeamStatsFilterSerializer,
     UserGameSerializer,
 )
-from games.services import import_games
+from games.services import games_changed, get_changed_game_keys, get_game_keys
+from games.stats import STATS_SOURCE_FIELDS
 
 
-class SeasonViewSet(viewsets.ModelViewSet):
+class SeasonViewSet(CachedReferenceViewSetMixin, viewsets.ModelViewSet):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated, AdminsOnlyPermission)
     model = Season
     queryset = Season.objects.order_by("-id")
     serializer_class = SeasonSerializer
+    cache_namespace = "seasons"
 
 
-class LeagueViewSet(viewsets.ModelViewSet):
+class LeagueViewSet(CachedReferenceViewSetMixin, viewsets.ModelViewSet):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated, AdminsOnlyPermission)
     model = League
     queryset = League.objects.order_by("-id")
     serializer_class = LeagueSerializer
+    cache_namespace = "leagues"
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(CachedReferenceViewSetMixin, viewsets.ModelViewSet):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated, AdminsOnlyPermission)
     model = Team
     queryset = Team.objects.order_by("-id")
     serializer_class = TeamSerializer
+    cache_namespace = "teams"
+
+
+class ExpandGameViewSetMixin:
+    """
+    Join the relations requested through `?expand=` so that every page is
+    still served by a single query.
+    """
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        expanded_fields = self.get_serializer_class().get_expanded_fields(self.request)
+        if expanded_fields:
+            qs = qs.select_related(*expanded_fields)
+        return qs
+
+
+class FastGameListViewSetMixin:
+    """
+    Build list pages from `.values()` rows through the RowMapper of the
+    serializer, the same output without the per-field work of DRF. Pages
+    with `?expand=` still go through the serializer.
+
+    Only the list is rendered by `list_renderer_classes`, FastJSONRenderer
+    (orjson when installed) writes NaN as null where JSONRenderer refuses
+    it, which game lists never hold. The other actions keep the renderers
+    of the settings.
+    """
+
+    fast_list = True
+    list_renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def get_renderers(self):
+        if self.action == "list":
+            return [renderer() for renderer in self.list_renderer_classes]
+        return super().get_renderers()
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if not self.fast_list or serializer_class.get_expanded_fields(request):
+            return super().list(request, *args, **kwargs)
+
+        mapper = RowMapper.for_serializer(serializer_class)
+        queryset = self.filter_queryset(self.get_queryset()).values(*mapper.columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(mapper.map(queryset))
+        return self.get_paginated_response(mapper.map(page))
 
 
 class AdminGameViewSet(
+    FastGameListViewSetMixin,
+    ExpandGameViewSetMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -59,30 +147,162 @@ class AdminGameViewSet(
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated, AdminsOnlyPermission)
     model = Game
-    queryset = Game.objects.all()
+    queryset = Game.objects.order_by("-id")
     serializer_class = AdminGameSerializer
+    pagination_class = GamePagination
+    filter_backends = (GameFilterBackend,)
+    list_renderer_classes = (
+        *FastGameListViewSetMixin.list_renderer_classes,
+        NDJSONRenderer,
+    )
+
+    def list(self, request, *args, **kwargs):
+        """
+        With `Accept: application/x-ndjson`, stream every matching game as
+        one JSON line instead of a page. `expand` is not applied there.
+        """
+        if request.accepted_renderer.format != NDJSONRenderer.format:
+            return super().list(request, *args, **kwargs)
+        return StreamingHttpResponse(
+            iter_game_ndjson(
+                self.filter_queryset(self.get_queryset()),
+                RowMapper.for_serializer(self.get_serializer_class()),
+            ),
+            content_type=NDJSONRenderer.media_type,
+        )
+
+    def perform_update(self, serializer):
+        old_keys = get_game_keys([serializer.instance])
+        changes = serializer.validated_data
+        with transaction.atomic():
+            game = serializer.save(
+                **(get_score_totals(changes["scores"]) if "scores" in changes else {})
+            )
+            # the period rows carry the season and the teams too
+            rescored = [game] if set(SCORE_SOURCE_FIELDS) & changes.keys() else []
+            games_changed(old_keys, get_game_keys([game]), rescored=rescored)
+
+    def perform_destroy(self, instance):
+        keys = get_game_keys([instance])
+        with transaction.atomic():
+            instance.delete()
+            games_changed(keys)
+
+    @action(detail=False, methods=["GET"], url_path="export", url_name="export")
+    def export(self, request):
+        """
+        Stream every game matching the list filters as one Parquet or gzip
+        CSV file (`file_format`), with the teams and leagues denormalized.
+        """
+        serializer = GameExportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        file_format = serializer.validated_data["file_format"]
+        content_type, extension = EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            iter_game_export(
+                self.filter_queryset(self.get_queryset()), file_format=file_format
+            ),
+            content_type=content_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="games.{extension}"'
+        return response
+
+    @staticmethod
+    def get_bulk_queryset(selection: dict):
+        qs = Game.objects.all()
+        if selection.get("ids"):
+            qs = qs.filter(pk__in=selection["ids"])
+        return filter_games(qs, selection.get("filter") or {})
+
+    @action(detail=False, methods=["PATCH", "DELETE"], url_path="bulk", url_name="bulk")
+    def bulk(self, request):
+        """
+        Update (`data`) or delete the games selected by `ids` and/or `filter`
+        with set-based statements in one transaction.
+        """
+        selection_serializer = BulkGameSelectionSerializer(data=request.data)
+        selection_serializer.is_valid(raise_exception=True)
+        qs = self.get_bulk_queryset(selection_serializer.validated_data)
+
+        if request.method == "DELETE":
+            try:
+                with transaction.atomic():
+                    keys = get_game_keys(qs)
+                    # the count of the games alone, without their period rows
+                    deleted = qs.delete()[1].get(Game._meta.label, 0)
+                    games_changed(keys)
+            except ProtectedError as error:
+                return Response(
+                    {"success": False, "detail": str(error.args[0])},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return Response(
+                {"success": True, "deleted": deleted}, status=status.HTTP_200_OK
+            )
+
+        changes_serializer = BulkGameChangesSerializer(
+            data=request.data.get("data"), partial=True
+        )
+        changes_serializer.is_valid(raise_exception=True)
+        if not changes_serializer.validated_data:
+            return Response(
+                {"data": ["Nothing to update."]}, status=status.HTTP_400_BAD_REQUEST
+            )
+        changes = changes_serializer.validated_data
+        with transaction.atomic():
+            keys = get_game_keys(qs)
+            rescored = []
+            if set(SCORE_SOURCE_FIELDS) & changes.keys():
+                rescored = list(qs.only(*SCORE_SOURCE_FIELDS))
+            if "scores" in changes:
+                changes.update(get_score_totals(changes["scores"]))
+            updated = qs.update(**changes)
+            for game in rescored:
+                for field in SCORE_SOURCE_FIELDS:
+                    if field in changes:
+                        setattr(game, field, changes[field])
+            games_changed(
+                keys,
+                get_changed_game_keys(keys, changes),
+                rescored=rescored,
+                stats=bool(set(STATS_SOURCE_FIELDS) & changes.keys()),
+            )
+        return Response(
+            {"success": True, "updated": updated}, status=status.HTTP_200_OK
+        )
 
 
 class UserAssignedGameViewSet(
-    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    FastGameListViewSetMixin,
+    ExpandGameViewSetMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated, UsersOnlyPermission)
     model = Game
     serializer_class = UserGameSerializer
+    pagination_class = GamePagination
+    filter_backends = (GameFilterBackend,)
     queryset = Game.objects.all()
 
     def get_queryset(self):
         if not getattr(self, "swagger_fake_view", False):
             qs = super().get_queryset()
             return qs.filter(
-                country__in=self.request.user.countries.all(), user=self.request.user
+                country_id__in=get_user_countries_lookup(self.request.user),
+                user=self.request.user,
             ).order_by("-id")
         return self.model.objects.none()
 
 
 class UserUnassignedGameViewSet(
-    mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+    FastGameListViewSetMixin,
+    ExpandGameViewSetMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
 ):
     """see games from their country with games unassigned to them
     assign games to themselves
@@ -92,6 +312,8 @@ class UserUnassignedGameViewSet(
     permission_classes = (IsAuthenticated, UsersOnlyPermission)  # user
     model = Game
     serializer_class = UserGameSerializer
+    pagination_class = GamePagination
+    filter_backends = (GameFilterBackend,)
     http_method_names = ["get", "post"]
     queryset = Game.objects.all()
 
@@ -99,7 +321,8 @@ class UserUnassignedGameViewSet(
         if not getattr(self, "swagger_fake_view", False):
             qs = super().get_queryset()
             return qs.filter(
-                country__in=self.request.user.countries.all(), user__isnull=True
+                country_id__in=get_user_countries_lookup(self.request.user),
+                user__isnull=True,
             ).order_by("-id")
         return self.model.objects.none()
 
@@ -107,10 +330,214 @@ class UserUnassignedGameViewSet(
         detail=True, methods=["POST"], url_path="assign-game", url_name="assign-game"
     )
     def assign_game(self, request, pk):
-        instance = self.get_object()
-        instance.user = request.user
-        instance.save(update_fields=["user"])
-        return Response({"success": True}, status=status.HTTP_200_OK)
+        # a single conditional UPDATE, of two concurrent requests only one
+        # still finds the game unassigned, and the day of the game is
+        # refreshed in the same transaction
+        game = self.get_queryset().filter(pk=pk)
+        with transaction.atomic():
+            # the UPDATE comes first, a read before it would make SQLite
+            # give up on the lock held by a concurrent claim
+            assigned = game.update(user=request.user)
+            if assigned:
+                games_changed(get_game_keys(Game.objects.filter(pk=pk)), stats=False)
+        if assigned:
+            return Response({"success": True}, status=status.HTTP_200_OK)
+
+        visible = Game.objects.filter(
+            pk=pk, country_id__in=get_user_country_ids(request.user)
+        )
+        if not visible.exists():
+            raise NotFound()
+        return Response(
+            {"success": False, "detail": "Game already assigned."},
+            status=status.HTTP_409_CONFLICT,
+        )
+
+    @action(
+        detail=False,
+        methods=["POST"],
+        url_path="assign-games",
+        url_name="assign-games",
+    )
+    def assign_games(self, request):
+        """
+        Claim up to `limit` unassigned games, the oldest first, optionally
+        among `ids`. Candidates taken by a concurrent request are replaced by
+        the next ones until `limit` games are claimed or none is left.
+        """
+        serializer = AssignGamesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        candidates = self.get_queryset()
+        if "ids" in serializer.validated_data:
+            candidates = candidates.filter(pk__in=serializer.validated_data["ids"])
+        candidates = candidates.order_by("id").values_list("pk", flat=True)
+        limit = serializer.validated_data["limit"]
+        candidate_ids = list(candidates[:limit])
+
+        claimed = []
+        with transaction.atomic():
+            # the UPDATE opens the transaction, SQLite fails a read before it
+            # under concurrent writers instead of waiting for the lock
+            while candidate_ids:
+                Game.objects.filter(pk__in=candidate_ids, user__isnull=True).update(
+                    user=request.user
+                )
+                claimed += Game.objects.filter(
+                    pk__in=candidate_ids, user=request.user
+                ).values_list("pk", flat=True)
+                candidate_ids = []
+                if len(claimed) < limit:
+                    candidate_ids = list(candidates[: limit - len(claimed)])
+            if claimed:
+                games_changed(
+                    get_game_keys(Game.objects.filter(pk__in=claimed)), stats=False
+                )
+        assigned = len(claimed)
+        return Response(
+            {"success": True, "assigned": assigned}, status=status.HTTP_200_OK
+        )
+
+
+class UserCalendarAPIView(APIView):
+    """
+    The games of the user's countries grouped by day, either the games
+    assigned to the user or the open ones. Served from the GameDay buckets,
+    so a week is a single range read whatever the size of the games table.
+    """
+
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated, UsersOnlyPermission)
+
+    def get(self, request, *args, **kwargs):
+        serializer = GameCalendarSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        date_from = serializer.validated_data.get("date_from") or timezone.localdate()
+        date_to = date_from + datetime.timedelta(
+            days=serializer.validated_data["days"] - 1
+        )
+        user_id = (
+            request.user.id
+            if serializer.validated_data["scope"] == "assigned"
+            else None
+        )
+
+        games_by_day = {}
+        game_days = GameDay.objects.filter(
+            country_id__in=get_user_country_ids(request.user),
+            date__range=(date_from, date_to),
+        ).values_list("date", "games")
+        for day, games in game_days:
+            games_by_day.setdefault(day, []).extend(
+                game for game in games if game["user"] == user_id
+            )
+
+        days = []
+        for day in sorted(games_by_day):
+            games = sorted(
+                games_by_day[day], key=lambda game: (game["datetime"], game["id"])
+            )
+            if games:
+                days.append({"date": str(day), "games": games})
+        return Response(
+            {"date_from": str(date_from), "date_to": str(date_to), "days": days},
+            status=status.HTTP_200_OK,
+        )
+
+
+class StandingsAPIView(APIView):
+    """
+    Standings of a league season, read from the Standing rows that the game
+    imports and the admin endpoints keep up to date.
+    """
+
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        serializer = StandingFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        standings = (
+            Standing.objects.filter(**serializer.validated_data)
+            .select_related("team")
+            .order_by(
+                ExpressionWrapper(
+                    F("wins") * 1.0 / F("games_played"), output_field=FloatField()
+                ).desc(),
+                (F("points_for") - F("points_against")).desc(),
+                "team_id",
+            )
+        )
+        return Response(
+            {
+                **serializer.validated_data,
+                "results": StandingSerializer(standings, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class TeamStatsAPIView(APIView):
+    """
+    Season totals and per game averages of a team, read from the
+    TeamSeasonStats rows that the game imports keep up to date.
+    """
+
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        serializer = TeamStatsFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        stats = TeamSeasonStats.objects.filter(**serializer.validated_data).order_by(
+            "-season_id"
+        )
+        return Response(
+            {
+                "team": serializer.validated_data["team"],
+                "results": TeamSeasonStatsSerializer(stats, many=True).data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class HeadToHeadAPIView(APIView):
+    """
+    Record of a team against an opponent, per season and overall, read from
+    the pre-aggregated HeadToHead rows.
+    """
+
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        serializer = HeadToHeadFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        seasons = HeadToHead.objects.filter(**serializer.validated_data).order_by(
+            "-season_id"
+        )
+        results = HeadToHeadSerializer(seasons, many=True).data
+        totals = {
+            field: sum(row[field] for row in results)
+            for field in (
+                "games_played",
+                "wins",
+                "losses",
+                "points_for",
+                "points_against",
+            )
+        }
+        return Response(
+            {
+                "team": serializer.validated_data["team"],
+                "opponent": serializer.validated_data["opponent"],
+                **totals,
+                "last_played": max(
+                    (row["last_played"] for row in results), default=None
+                ),
+                "seasons": results,
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 class ImportGameAPIView(APIView):
@@ -120,33 +547,17 @@ class ImportGameAPIView(APIView):
     def post(self, request, *args, **kwargs):
         params_serializer = ImportGameSerializer(data=request.data)
         params_serializer.is_valid(raise_exception=True)
-        headers = dict()
-        headers["X-RapidAPI-Key"] = os.getenv("RAPID_API_KEY")
-        headers["X-RapidAPI-Host"] = "api-basketball.p.rapidapi.com"
-        response = requests.get(
-            url="https://api-basketball.p.rapidapi.com/games",
-            headers=headers,
-            params=params_serializer.validated_data,
-        )
-
-        if response.status_code == 200:
-            data = json.loads(response.text)
-            if not data["results"]:
-                return Response(
-                    {"success": False, "message": "No results matched."},
-                    status=status.HTTP_204_NO_CONTENT,
-                )
-            import_games(data=data["response"])
+        params = dict(params_serializer.validated_data)
+        upsert = params.pop("upsert")
+        job = enqueue_import_job(params=params, upsert=upsert, user=request.user)
+        return Response(
+            {"success": True, "job": job.id}, status=status.HTTP_202_ACCEPTED
+        )
 
-        elif response.status_code == 400:
-            data = json.loads(response.text)
-            return Response(
-                {"success": False, "message": data["errors"]},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        else:
-            return Response(
-                {"success": False, "message": "Service unavailable."},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE,
-            )
-        return Response({"success": True}, status=status.HTTP_201_CREATED)
+
+class ImportJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated, AdminsOnlyPermission)
+    model = ImportJob
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer